@@ -0,0 +1,263 @@
+"""
+Binary append-only arrival log.
+
+Every arrival is one fixed-width 24 byte record:
+
+    lane code (uint8) | padding (7 bytes) | vehicle ID (uint64) | arrival timestamp in ms (int64)
+
+Vehicle IDs increase monotonically across the whole log, so two vehicles
+generated in the same millisecond no longer share an ID like the text format's
+"{lane}_{timestamp}". Writers buffer records and append them in batches;
+readers mmap the file and unpack records straight out of the mapping.
+"""
+import json
+import mmap
+import os
+import struct
+import time
+
+from transport import DATA_DIR, LANE_CODES, LANES
+
+LOG_FILE = os.path.join(DATA_DIR, "arrivals.bin")
+
+RECORD = struct.Struct("<B7xQq")
+
+# Same layout as RECORD for NumPy bulk writes (see ArrivalLogWriter.write_array)
+RECORD_DTYPE = {
+    "names": ["lane", "vehicle_id", "timestamp"],
+    "formats": ["u1", "<u8", "<i8"],
+    "offsets": [0, 8, 16],
+    "itemsize": RECORD.size,
+}
+
+
+class ArrivalLogWriter:
+    """
+    Appends records in batches. IDs continue from the last record already in the
+    log, so restarting the generator doesn't reuse IDs.
+    """
+
+    def __init__(self, path=LOG_FILE, batch_size=1024):
+        self.path = path
+        self.batch_size = batch_size
+        self.buffer = bytearray()
+        self.pending = 0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.file = open(path, "ab")
+        self.next_id = self._last_id() + 1
+
+    def _last_id(self):
+        size = os.path.getsize(self.path)
+        # Ignore a torn record at the end, if a previous writer died mid-write
+        size -= size % RECORD.size
+        if size == 0:
+            return 0
+        with open(self.path, "rb") as f:
+            f.seek(size - RECORD.size)
+            return RECORD.unpack(f.read(RECORD.size))[1]
+
+    def append(self, lane_id, timestamp):
+        """
+        Buffers one arrival and returns the vehicle ID it was given
+        """
+        vehicle_id = self.next_id
+        self.next_id += 1
+        self.buffer += RECORD.pack(LANE_CODES[lane_id], vehicle_id, timestamp)
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.flush()
+        return vehicle_id
+
+    def write(self, lane_id, timestamps):
+        """
+        Transport-style writer API. Flushes at the end so readers see the arrivals right away.
+        """
+        for timestamp in timestamps:
+            self.append(lane_id, timestamp)
+        self.flush()
+
+    def write_array(self, lane_codes, timestamps):
+        """
+        Bulk append for NumPy arrays of lane codes and timestamps (same length).
+        Packs every record in one go instead of one struct.pack per arrival.
+        Returns the ID given to the first record.
+        """
+        import numpy as np
+
+        n = len(timestamps)
+        records = np.zeros(n, dtype=RECORD_DTYPE)
+        records["lane"] = lane_codes
+        records["vehicle_id"] = np.arange(self.next_id, self.next_id + n, dtype=np.uint64)
+        records["timestamp"] = timestamps
+
+        first_id = self.next_id
+        self.next_id += n
+        self.flush()
+        self.file.write(records.tobytes())
+        self.file.flush()
+        return first_id
+
+    def flush(self):
+        if self.buffer:
+            self.file.write(self.buffer)
+            self.file.flush()
+            self.buffer = bytearray()
+            self.pending = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+class ArrivalLogReader:
+    """
+    Reads new records from the log through an mmap. The mapping is only redone
+    when the file has grown past it.
+
+    A reader with a consumer name saves its position next to the log
+    (.<log name>.offset-<consumer>.json) and picks up from there when restarted,
+    like TailingFileReader. Without one it starts at offset.
+    """
+
+    SAVE_INTERVAL = 1.0  # seconds between position saves
+
+    def __init__(self, path=LOG_FILE, offset=0, consumer=None):
+        self.path = path
+        self.offset = offset  # bytes consumed so far, always a multiple of RECORD.size
+        self.file = None
+        self.map = None
+        self.pending = {lane_id: [] for lane_id in LANES}
+
+        self.offset_path = None
+        self._dirty = False
+        self._last_save = 0.0
+        if consumer is not None:
+            directory, name = os.path.split(path)
+            self.offset_path = os.path.join(directory, f".{name}.offset-{consumer}.json")
+            if os.path.exists(self.offset_path):
+                with open(self.offset_path) as f:
+                    self.restore_state(json.load(f))
+
+    def _remap(self, size):
+        if self.map is not None:
+            self.map.close()
+        if self.file is None:
+            self.file = open(self.path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), size, access=mmap.ACCESS_READ)
+
+    def records(self):
+        """
+        Yields (lane_code, vehicle_id, timestamp) for every complete record written
+        since the last call. Records are unpacked in place from the mapping.
+        """
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return
+        size -= size % RECORD.size  # a batch might still be half written
+        if size < self.offset:
+            # Shorter than what was read already: the log was started over
+            self.offset = 0
+        if size <= self.offset:
+            return
+
+        if self.map is None or len(self.map) < size:
+            self._remap(size)
+
+        view = memoryview(self.map)[self.offset:size]
+        try:
+            yield from RECORD.iter_unpack(view)
+        finally:
+            view.release()
+        self.offset = size
+        self._dirty = True
+
+    def read_new(self, lane_id):
+        """
+        Transport-style reader API: new vehicle IDs (ints) for one lane.
+        """
+        for code, vehicle_id, _ in self.records():
+            self.pending[LANES[code]].append(vehicle_id)
+
+        vehicle_ids = self.pending.get(lane_id, [])
+        self.pending[lane_id] = []
+        if vehicle_ids:
+            self._dirty = True
+        if self._dirty and time.monotonic() - self._last_save >= self.SAVE_INTERVAL:
+            self.save_offset()
+        return vehicle_ids
+
+    def state(self):
+        return {"offset": self.offset, "pending": {lane_id: list(ids) for lane_id, ids in self.pending.items()}}
+
+    def restore_state(self, state):
+        self.offset = state["offset"]
+        self.pending = {lane_id: list(ids) for lane_id, ids in state["pending"].items()}
+        self._dirty = True
+
+    def save_offset(self):
+        """
+        Writes the position (and records read but not handed out yet) for the
+        consumer; nothing to do without one
+        """
+        if self.offset_path is None:
+            return
+        tmp_path = self.offset_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.state(), f)
+        os.replace(tmp_path, self.offset_path)
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+    def close(self):
+        if self._dirty:
+            self.save_offset()
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def convert_text_logs(data_dir=DATA_DIR, out_path=LOG_FILE):
+    """
+    Converts the old lane_data/<lane>.txt files into the binary log.
+    Arrivals are written in timestamp order and get fresh unique IDs.
+    Returns how many records were written.
+    """
+    arrivals = []
+    for lane_id in LANES:
+        path = os.path.join(data_dir, f"{lane_id}.txt")
+        if not os.path.exists(path):
+            continue
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                # "{lane}_{timestamp}"
+                timestamp = line.rpartition("_")[2]
+                arrivals.append((int(timestamp), lane_id))
+
+    # sort is stable, so same-millisecond arrivals keep their file order
+    arrivals.sort(key=lambda arrival: arrival[0])
+
+    writer = ArrivalLogWriter(out_path)
+    for timestamp, lane_id in arrivals:
+        writer.append(lane_id, timestamp)
+    writer.close()
+    return len(arrivals)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert lane_data/*.txt into the binary arrival log")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--out", default=LOG_FILE)
+    args = parser.parse_args()
+
+    count = convert_text_logs(args.data_dir, args.out)
+    print(f"Converted {count} arrivals into {args.out}")
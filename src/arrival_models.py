@@ -0,0 +1,183 @@
+"""
+Seeded, vectorised arrival generation for load tests.
+
+traffic_generator.vehicles_arriving draws one lane at a time with the random
+module and never more than two vehicles per tick. Here an arrival model draws a
+whole (steps, lanes) block of counts with NumPy at once, and BulkGenerator turns
+the counts into timestamps and hands them to a transport writer in bulk.
+
+Models (vehicles per lane, per step of `step` seconds):
+
+- BernoulliModel: traffic_generator's odds (0-2 vehicles per tick)
+- PoissonModel: constant rate
+- TimeOfDayModel: Poisson with the rate following an hourly curve (rush hours)
+- PlatoonModel: vehicles arrive in bunches, e.g. released by an upstream light
+
+Everything comes from one np.random.Generator, so the same seed always gives the
+same arrivals.
+"""
+import time
+
+import numpy as np
+
+from traffic_generator import FIRST_VEHICLE_CHANCE, SECOND_VEHICLE_CHANCE
+from transport import LANE_CODES, LANES
+
+# Relative traffic per hour of the day (0-23): quiet nights, morning and evening rush
+DAY_CURVE = [
+    0.2, 0.1, 0.1, 0.1, 0.2, 0.4, 0.8, 1.6, 2.0, 1.4, 1.0, 1.0,
+    1.1, 1.1, 1.0, 1.1, 1.5, 2.0, 1.8, 1.2, 0.9, 0.7, 0.5, 0.3,
+]
+
+
+class BernoulliModel:
+    """
+    Same odds as traffic_generator.vehicles_arriving, one tick per step
+    """
+
+    def __init__(self, first=FIRST_VEHICLE_CHANCE, second=SECOND_VEHICLE_CHANCE):
+        self.first = first
+        self.second = second
+
+    def counts(self, rng, start, n_steps, step, n_lanes):
+        draws = rng.random((n_steps, n_lanes, 2))
+        counts = (draws[..., 0] < self.first).astype(np.int64)
+        counts += draws[..., 1] < self.second
+        return counts
+
+
+class PoissonModel:
+    def __init__(self, rate):
+        """
+        rate: mean vehicles per second per lane
+        """
+        self.rate = rate
+
+    def counts(self, rng, start, n_steps, step, n_lanes):
+        return rng.poisson(self.rate * step, size=(n_steps, n_lanes))
+
+
+class TimeOfDayModel:
+    def __init__(self, rate, curve=DAY_CURVE):
+        """
+        rate: mean vehicles per second per lane at a curve value of 1.
+        The curve has one value per hour and is interpolated in between. The time
+        of day is the step's timestamp modulo 24h (UTC).
+        """
+        self.rate = rate
+        self.curve = np.asarray(list(curve) + [curve[0]], dtype=float)  # wrap around midnight
+
+    def rates(self, start, n_steps, step):
+        middle = start + (np.arange(n_steps) + 0.5) * step
+        hours = (middle % 86400) / 3600
+        return self.rate * np.interp(hours, np.arange(len(self.curve)), self.curve)
+
+    def counts(self, rng, start, n_steps, step, n_lanes):
+        mean = self.rates(start, n_steps, step) * step
+        return rng.poisson(mean[:, None], size=(n_steps, n_lanes))
+
+
+class PlatoonModel:
+    def __init__(self, rate, mean_size=5):
+        """
+        rate: platoons per second per lane. Platoon sizes are geometric with mean mean_size.
+        """
+        if mean_size < 1:
+            raise ValueError("mean_size must be at least 1")
+        self.rate = rate
+        self.mean_size = mean_size
+
+    def counts(self, rng, start, n_steps, step, n_lanes):
+        platoons = rng.poisson(self.rate * step, size=(n_steps, n_lanes))
+        # Sum of k geometric sizes = k + negative binomial(k, p) extra vehicles
+        extra = rng.negative_binomial(np.maximum(platoons, 1), 1 / self.mean_size)
+        return platoons + np.where(platoons > 0, extra, 0)
+
+
+MODELS = {
+    "bernoulli": BernoulliModel,
+    "poisson": PoissonModel,
+    "time-of-day": TimeOfDayModel,
+    "platoon": PlatoonModel,
+}
+
+
+def make_model(name, rate=0.2, platoon_size=5):
+    if name == "bernoulli":
+        return BernoulliModel()
+    if name == "platoon":
+        return PlatoonModel(rate, platoon_size)
+    return MODELS[name](rate)
+
+
+class BulkGenerator:
+    def __init__(self, model, seed=None, step=1.0, lanes=LANES):
+        self.model = model
+        self.rng = np.random.default_rng(seed)
+        self.step = step
+        self.lanes = list(lanes)
+        self.codes = np.array([LANE_CODES[lane_id] for lane_id in self.lanes], dtype=np.uint8)
+
+    def draw(self, start_ms, n_steps):
+        """
+        Arrivals for n_steps steps starting at start_ms, as (lane codes, timestamps in ms)
+        arrays in timestamp order. Vehicles are spread uniformly over their step.
+        """
+        counts = self.model.counts(self.rng, start_ms / 1000, n_steps, self.step, len(self.lanes))
+        flat = counts.ravel()  # step-major, so the (step, lane) cells are in time order
+
+        step_ms = self.step * 1000
+        cell_start = start_ms + np.repeat(np.arange(n_steps) * step_ms, len(self.lanes))
+        timestamps = np.repeat(cell_start, flat) + self.rng.random(flat.sum()) * step_ms
+        lane_codes = np.repeat(np.tile(self.codes, n_steps), flat)
+
+        order = np.argsort(timestamps, kind="stable")
+        return lane_codes[order], timestamps[order].astype(np.int64)
+
+    def write(self, writer, lane_codes, timestamps):
+        """
+        Hands a drawn batch to a transport writer: in one go if it has write_array
+        (the binary log), otherwise one write() call per lane.
+        """
+        if hasattr(writer, "write_array"):
+            writer.write_array(lane_codes, timestamps)
+            return
+        for code, lane_id in zip(self.codes, self.lanes):
+            lane_timestamps = timestamps[lane_codes == code]
+            if len(lane_timestamps):
+                writer.write(lane_id, lane_timestamps.tolist())
+
+    def load_test(self, writer, duration, start_ms=None, chunk_steps=3600):
+        """
+        Generates `duration` seconds of traffic as fast as possible. Returns a report
+        with the arrivals written per wall-clock second.
+        """
+        start_ms = int(time.time() * 1000) if start_ms is None else start_ms
+        n_steps = int(duration / self.step)
+        arrivals = 0
+
+        wall_start = time.perf_counter()
+        for first in range(0, n_steps, chunk_steps):
+            steps = min(chunk_steps, n_steps - first)
+            lane_codes, timestamps = self.draw(start_ms + first * self.step * 1000, steps)
+            self.write(writer, lane_codes, timestamps)
+            arrivals += len(timestamps)
+        wall = time.perf_counter() - wall_start
+
+        return {
+            "simulated_seconds": n_steps * self.step,
+            "arrivals": arrivals,
+            "wall_seconds": wall,
+            "arrivals_per_second": arrivals / wall if wall > 0 else float("inf"),
+        }
+
+    def run_realtime(self, writer):
+        """
+        Writes each step's arrivals as it happens, like run_generator_loop
+        """
+        while True:
+            start_ms = int(time.time() * 1000)
+            lane_codes, timestamps = self.draw(start_ms, 1)
+            self.write(writer, lane_codes, timestamps)
+            print(f"[GENERATOR] Added {len(timestamps)} vehicle(s)")
+            time.sleep(max(start_ms / 1000 + self.step - time.time(), 0))
@@ -0,0 +1,204 @@
+"""
+Vectorised batch engine for running the Intersection policy over many
+independent scenarios at once.
+
+Only the L2 queue lengths matter to Intersection.step, so each scenario is just
+a row of 4 integers (AL2, BL2, CL2, DL2) and a whole batch is an (N, 4) array.
+Every step applies the same rules as Intersection in whole-array operations:
+
+- priority: if AL2 has more than 5 vehicles it is drained down to 5, nothing else moves
+- otherwise every normal lane serves up to max(total // 4, 1) vehicles
+  (normal_service_count), and AL2 is skipped while it has any vehicles
+
+run_scalar() replays one scenario through the real Intersection so the two can
+be compared on the same seed.
+"""
+import numpy as np
+
+from event_log import EventLog
+from intersection import Intersection
+from metrics import Metrics
+from traffic_generator import FIRST_VEHICLE_CHANCE, LANES, SECOND_VEHICLE_CHANCE
+from vehicle import Vehicle
+
+PRIORITY_COLUMN = LANES.index("AL2")
+PRIORITY_DRAIN_TO = 5  # the priority controller drains AL2 while size > 5
+
+
+def iter_arrivals(seed, n_steps, n_scenarios, chunk_steps=64):
+    """
+    Yields one (n_scenarios, 4) array of arrivals per step, with the same odds as
+    traffic_generator.vehicles_arriving. Draws happen a chunk of steps at a time so
+    long runs don't need all arrivals in memory; the random stream is identical to
+    draw_arrivals() for the same seed.
+    """
+    rng = np.random.default_rng(seed)
+    remaining = n_steps
+    while remaining > 0:
+        steps = min(chunk_steps, remaining)
+        draws = rng.random((steps, n_scenarios, len(LANES), 2))
+        arrivals = (draws[..., 0] < FIRST_VEHICLE_CHANCE).astype(np.int64)
+        arrivals += draws[..., 1] < SECOND_VEHICLE_CHANCE
+        yield from arrivals
+        remaining -= steps
+
+
+def draw_arrivals(seed, n_steps, n_scenarios):
+    """
+    All arrivals at once, shape (n_steps, n_scenarios, 4).
+    """
+    return np.array(list(iter_arrivals(seed, n_steps, n_scenarios)), dtype=np.int64).reshape(
+        n_steps, n_scenarios, len(LANES))
+
+
+class BatchSimulator:
+    def __init__(self, n_scenarios):
+        self.n = n_scenarios
+        self.queues = np.zeros((n_scenarios, len(LANES)), dtype=np.int64)
+
+        # Per-scenario statistics
+        self.steps = 0
+        self.served_per_lane = np.zeros((n_scenarios, len(LANES)), dtype=np.int64)
+        self.priority_steps = np.zeros(n_scenarios, dtype=np.int64)
+        self.queued_sum = np.zeros(n_scenarios, dtype=np.int64)
+        self.max_queue = np.zeros(n_scenarios, dtype=np.int64)
+
+    def step(self, arrivals):
+        """
+        Add one step of arrivals (shape (N, 4)) and run one Intersection.step on every scenario.
+        """
+        q = self.queues
+        q += arrivals
+
+        al2 = q[:, PRIORITY_COLUMN]
+        priority = al2 > PRIORITY_DRAIN_TO
+
+        # Normal service: average over all 4 lanes, at least 1 vehicle per lane
+        per_lane = np.maximum(q.sum(axis=1) // len(LANES), 1)
+        served = np.minimum(q, per_lane[:, None])
+        # AL2 is never served in normal mode: either it's empty, or the priority
+        # queue still points at it and the controller skips it
+        served[:, PRIORITY_COLUMN] = 0
+
+        # Priority scenarios only drain AL2
+        served[priority] = 0
+        served[priority, PRIORITY_COLUMN] = al2[priority] - PRIORITY_DRAIN_TO
+
+        q -= served
+
+        self.steps += 1
+        self.served_per_lane += served
+        self.priority_steps += priority
+        self.queued_sum += q.sum(axis=1)
+        np.maximum(self.max_queue, q.max(axis=1), out=self.max_queue)
+
+    def run(self, arrivals):
+        """
+        arrivals is any iterable of per-step (N, 4) arrays, e.g. iter_arrivals()
+        """
+        for step_arrivals in arrivals:
+            self.step(step_arrivals)
+        return self.results()
+
+    def results(self):
+        """
+        Per-scenario statistics as arrays of length N.
+        """
+        return {
+            "throughput": self.served_per_lane.sum(axis=1),
+            "served_per_lane": self.served_per_lane.copy(),
+            "priority_steps": self.priority_steps.copy(),
+            "mean_queue": self.queued_sum / max(self.steps, 1),
+            "max_queue": self.max_queue.copy(),
+            "final_queues": self.queues.copy(),
+        }
+
+
+def run_scalar(arrivals):
+    """
+    Replays one scenario (arrivals of shape (n_steps, 4)) through the real
+    Intersection and collects the same statistics as BatchSimulator.
+    """
+    metrics = Metrics()
+    intersection = Intersection(metrics=metrics, event_log=EventLog.disabled())
+    lanes = [intersection.roads[lane_id[0]].L2 for lane_id in LANES]
+
+    served_per_lane = np.zeros(len(LANES), dtype=np.int64)
+    priority_steps = 0
+    queued_sum = 0
+    max_queue = 0
+
+    for step_arrivals in arrivals:
+        for lane, count in zip(lanes, step_arrivals):
+            for _ in range(int(count)):
+                lane.add_vehicle(Vehicle(lane.lane_id))
+
+        if intersection.get_active_priority_lane() is not None:
+            priority_steps += 1
+        intersection.step()
+
+        sizes = [lane.size() for lane in lanes]
+        queued_sum += sum(sizes)
+        max_queue = max(max_queue, max(sizes))
+
+    for i, lane in enumerate(lanes):
+        served_per_lane[i] = metrics.vehicles_served_per_lane.get(lane.lane_id, 0)
+
+    return {
+        "throughput": metrics.total_vehicles_served,
+        "served_per_lane": served_per_lane,
+        "priority_steps": priority_steps,
+        "mean_queue": queued_sum / max(len(arrivals), 1),
+        "max_queue": max_queue,
+        "final_queues": np.array([lane.size() for lane in lanes]),
+    }
+
+
+def check_against_scalar(seed, n_steps, n_scenarios, scenarios=None):
+    """
+    Runs the batch engine and the scalar engine on the same seed and returns the
+    indices of scenarios whose statistics differ (empty list means they agree).
+    """
+    scenarios = list(range(n_scenarios) if scenarios is None else scenarios)
+    sim = BatchSimulator(n_scenarios)
+    # Only keep the arrival columns of the scenarios being checked
+    kept = []
+    for step_arrivals in iter_arrivals(seed, n_steps, n_scenarios):
+        sim.step(step_arrivals)
+        kept.append(step_arrivals[scenarios])
+    batch = sim.results()
+    kept = np.array(kept).reshape(n_steps, len(scenarios), len(LANES))
+
+    mismatched = []
+    for column, i in enumerate(scenarios):
+        scalar = run_scalar(kept[:, column])
+        for key, value in scalar.items():
+            if not np.allclose(batch[key][i], value):
+                mismatched.append(i)
+                break
+    return mismatched
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Vectorised batch intersection simulator")
+    parser.add_argument("--scenarios", type=int, default=10000)
+    parser.add_argument("--steps", type=int, default=3600)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--check", type=int, default=0, help="compare this many scenarios with the scalar engine")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    sim = BatchSimulator(args.scenarios)
+    stats = sim.run(iter_arrivals(args.seed, args.steps, args.scenarios))
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.scenarios} scenarios x {args.steps} steps in {elapsed:.2f}s")
+    print(f"Throughput: mean {stats['throughput'].mean():.1f}, min {stats['throughput'].min()}, max {stats['throughput'].max()}")
+    print(f"Mean queue: {stats['mean_queue'].mean():.2f}, worst max queue: {stats['max_queue'].max()}")
+
+    if args.check:
+        bad = check_against_scalar(args.seed, args.steps, args.scenarios, range(min(args.check, args.scenarios)))
+        print("Scalar check:", "OK" if not bad else f"mismatch in scenarios {bad}")
@@ -0,0 +1,250 @@
+"""
+Benchmarks for the core data path.
+
+Every benchmark runs at a few sizes (queue depth, lane backlog, file size,
+vehicles on screen) so the results show how the cost scales, not just one point:
+
+- queue:         Queue.enqueue + dequeue at a given depth (deque and ring buffer)
+- step:          Intersection.step with every L2 lane backed up to a given length
+- load_files:    simulator.load_vehicles_from_files with lane files of a given length
+- metrics:       Metrics.record_vehicle_served
+- visualizer:    one headless visualizer frame (tick + render) with a given number of cars
+
+Each size is timed several times and only the timed section counts (setup such
+as filling lanes or writing files is left out). Results are in nanoseconds per
+operation; "best" is the fastest repeat, which is the least noisy number on a
+busy machine and the one compare looks at.
+
+    python benchmarks.py run --out baseline.json
+    python benchmarks.py run --out current.json
+    python benchmarks.py compare baseline.json current.json --threshold 10
+"""
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from event_log import EventLog
+from intersection import Intersection
+from metrics import Metrics
+from queue_ds import Queue
+from simulator import load_vehicles_from_files
+from transport import LANES, FileLaneReader, FileLaneWriter
+from vehicle import Vehicle
+
+
+def bench_queue(depth, capacity=False, ops=20000):
+    """
+    enqueue + dequeue pairs on a queue holding depth items, so it stays at that depth
+    """
+    queue = Queue(capacity=depth + 1) if capacity else Queue()
+    for i in range(depth):
+        queue.enqueue(i)
+    enqueue, dequeue = queue.enqueue, queue.dequeue
+
+    start = time.perf_counter_ns()
+    for i in range(ops):
+        enqueue(i)
+        dequeue()
+    return time.perf_counter_ns() - start, ops
+
+
+def bench_queue_ring(depth):
+    return bench_queue(depth, capacity=True)
+
+
+def bench_step(backlog, steps=20):
+    """
+    Intersection.step with every L2 lane refilled to backlog vehicles before each step
+    """
+    intersection = Intersection(metrics=Metrics(), event_log=EventLog.disabled())
+    lanes = [road.L2 for road in intersection.roads.values()]
+    elapsed = 0
+    for _ in range(steps):
+        for lane in lanes:
+            for i in range(backlog - lane.size()):
+                lane.add_vehicle(Vehicle(i))
+        start = time.perf_counter_ns()
+        intersection.step()
+        elapsed += time.perf_counter_ns() - start
+    return elapsed, steps
+
+
+def bench_load_files(lines, rounds=5):
+    """
+    load_vehicles_from_files reading lane files of `lines` vehicles each (per vehicle)
+    """
+    data_dir = tempfile.mkdtemp(prefix="bench-lanes-")
+    try:
+        writer = FileLaneWriter(data_dir)
+        reader = FileLaneReader(data_dir)
+        timestamps = list(range(lines))
+        elapsed = 0
+        for _ in range(rounds):
+            intersection = Intersection(event_log=EventLog.disabled())
+            for lane_id in LANES:
+                writer.write(lane_id, timestamps)
+            start = time.perf_counter_ns()
+            load_vehicles_from_files(intersection, reader)
+            elapsed += time.perf_counter_ns() - start
+        return elapsed, rounds * lines * len(LANES)
+    finally:
+        shutil.rmtree(data_dir)
+
+
+def bench_metrics(calls):
+    metrics = Metrics()
+    rng = random.Random(0)
+    # Drawn up front so the RNG isn't part of the measurement
+    samples = [(LANES[i % len(LANES)], rng.expovariate(0.1)) for i in range(calls)]
+    record = metrics.record_vehicle_served
+
+    start = time.perf_counter_ns()
+    for lane_id, wait in samples:
+        record(lane_id, wait)
+    return time.perf_counter_ns() - start, calls
+
+
+def bench_visualizer(cars, frames=30):
+    """
+    One fixed tick plus a render, with `cars` cars spread over every road and lane
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    # pygame and NumPy are only needed here, so the other benchmarks run without them
+    import visualizer
+
+    sim = visualizer.Simulation(transport=None, seed=0)
+    try:
+        lane_types = ("L1", "L2", "L3")
+        for i in range(cars):
+            sim.vehicles.spawn(i, "ABCD"[i % 4], lane_types[i // 4 % 3])
+        # No arrivals during the measurement, just the cars above
+        sim.spawn_arrivals = lambda: None
+
+        start = time.perf_counter_ns()
+        for _ in range(frames):
+            sim.tick()
+            sim.render()
+        return time.perf_counter_ns() - start, frames
+    finally:
+        sim.close()
+
+
+# name -> (function, sizes, quick sizes, what one operation is)
+BENCHMARKS = {
+    "queue": (bench_queue, [10, 1000, 100000, 1000000], [10, 1000], "enqueue+dequeue"),
+    "queue_ring": (bench_queue_ring, [10, 1000, 100000, 1000000], [10, 1000], "enqueue+dequeue"),
+    "step": (bench_step, [10, 100, 1000, 10000], [10, 100], "step"),
+    "load_files": (bench_load_files, [10, 1000, 100000], [10, 1000], "vehicle"),
+    "metrics": (bench_metrics, [100000], [10000], "record_vehicle_served"),
+    "visualizer": (bench_visualizer, [0, 100, 1000, 3000], [0, 100], "frame"),
+}
+
+
+def run_benchmarks(names=None, quick=False, repeats=5):
+    """
+    Runs the benchmarks (all of them unless names is given). Returns the results
+    document that run writes out as JSON.
+    """
+    results = {}
+    for name in names or BENCHMARKS:
+        fn, sizes, quick_sizes, unit = BENCHMARKS[name]
+        for size in (quick_sizes if quick else sizes):
+            key = f"{name}[{size}]"
+            try:
+                timings = []
+                for _ in range(repeats):
+                    elapsed, ops = fn(size)
+                    timings.append(elapsed / ops)
+            except ImportError as e:
+                # e.g. the visualizer benchmark without pygame installed
+                print(f"{key:>24}  skipped: {e}")
+                break
+            results[key] = {
+                "benchmark": name,
+                "size": size,
+                "unit": f"ns/{unit}",
+                "best": min(timings),
+                "median": statistics.median(timings),
+                "repeats": timings,
+            }
+            print(f"{key:>24}  {min(timings):>14,.0f} ns/{unit}  (median {statistics.median(timings):,.0f})")
+
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "quick": quick,
+            "repeats": repeats,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold=10.0):
+    """
+    Compares two results documents. Returns [(key, baseline ns, current ns, change %,
+    regressed)] for every benchmark in both; regressed means more than threshold % slower.
+    """
+    rows = []
+    for key, base in baseline["results"].items():
+        now = current["results"].get(key)
+        if now is None:
+            continue
+        change = (now["best"] / base["best"] - 1) * 100 if base["best"] else 0.0
+        rows.append((key, base["best"], now["best"], change, change > threshold))
+    return rows
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmarks for the core data path")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the benchmarks and write the results as JSON")
+    run.add_argument("--out", default="benchmarks.json", help="results file")
+    run.add_argument("--only", default=None, help=f"comma separated subset of: {', '.join(BENCHMARKS)}")
+    run.add_argument("--quick", action="store_true", help="small sizes only, for a fast smoke run")
+    run.add_argument("--repeats", type=int, default=5, help="timed repeats per size")
+
+    check = commands.add_parser("compare", help="flag regressions against a saved baseline")
+    check.add_argument("baseline", help="results JSON to compare against")
+    check.add_argument("current", help="results JSON of the run being checked")
+    check.add_argument("--threshold", type=float, default=10.0,
+                       help="percent slowdown that counts as a regression")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        names = args.only.split(",") if args.only else None
+        unknown = set(names or ()) - set(BENCHMARKS)
+        if unknown:
+            parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+        document = run_benchmarks(names, args.quick, args.repeats)
+        with open(args.out, "w") as f:
+            json.dump(document, f, indent=2)
+        print(f"Results written to {args.out}")
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+
+        rows = compare(baseline, current, args.threshold)
+        for key, base, now, change, regressed in rows:
+            flag = "REGRESSION" if regressed else ""
+            print(f"{key:>24}  {base:>14,.0f} -> {now:>14,.0f} ns  {change:>+7.1f}%  {flag}")
+        missing = set(baseline["results"]) - set(current["results"])
+        if missing:
+            print(f"Not in {args.current}: {', '.join(sorted(missing))}")
+
+        regressions = sum(1 for row in rows if row[4])
+        print(f"{regressions} regression(s) over {args.threshold:g}% in {len(rows)} benchmark(s)")
+        # Non-zero exit so a script or CI job can fail on it
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,351 @@
+"""
+Binary checkpoints of a running intersection, so a restart picks up where it left off.
+
+A checkpoint holds every lane queue (vehicle IDs and arrival times), the light
+states, the controller's state (e.g. whether priority mode is on), the Metrics
+counters and wait histograms, and the arrival reader's position. Saving the
+reader's position together with the queues keeps them consistent: after a
+restore the reader picks up exactly the arrivals that came in after the
+checkpoint, even those another save of its own already moved past.
+
+File layout (little or big endian as the writer's machine, recorded in the header):
+
+    prelude   magic "TLCK", format version (u16), header length (u32),
+              CRC32 of everything after the prelude (u32)
+    header    JSON: lanes (kind, count, byte sizes), lights, controller,
+              metrics, reader state, clocks
+    sections  per lane in header order: IDs (int64 array, or newline
+              separated UTF-8 for string IDs), then arrival times (float64 array)
+
+Checkpointer keeps each lane's encoded section from the last checkpoint and only
+re-encodes lanes that changed since (lanes report changes through their
+listeners). The main thread only copies what changed; encoding and the write run
+on a background thread, and the file is swapped in atomically with os.replace,
+so a crash mid-write leaves the previous checkpoint intact.
+"""
+import gc
+import json
+import math
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+
+from lane_store import ColumnQueue
+from metrics import LatencyHistogram
+from vehicle import Vehicle, vehicle_label
+
+MAGIC = b"TLCK"
+VERSION = 1
+PRELUDE = struct.Struct("<4sHII")
+
+# Controller attributes that are state rather than configuration (see controllers.py)
+CONTROLLER_STATE = ("priority_active", "current", "phase_start")
+
+
+def _lanes(intersection):
+    return [lane for road in intersection.roads.values() for lane in (road.L1, road.L2, road.L3)]
+
+
+def _snapshot_lane(lane):
+    """
+    Cheap copy of a lane's contents for the writer thread: the columns of a compact
+    lane, otherwise the list of Vehicle objects (which don't change once queued)
+    """
+    if isinstance(lane.queue, ColumnQueue):
+        ids, times = lane.queue.columns()
+        if lane.queue.labelled:
+            # Interned codes only mean something in this process, and the label may be
+            # released before the writer gets to it, so look the labels up now
+            ids = [vehicle_label(code) for code in ids]
+        return ids, times
+    return list(lane.queue.items)
+
+
+def _encode_lane(snapshot):
+    """
+    Returns (kind, count, id bytes, time bytes)
+    """
+    if isinstance(snapshot, tuple):
+        ids, times = snapshot
+        if isinstance(ids, array):
+            return "int", len(ids), ids.tobytes(), times.tobytes()
+    else:
+        ids = [vehicle.vehicle_id for vehicle in snapshot]
+        times = array("d", [math.nan if vehicle.arrival_time is None else vehicle.arrival_time
+                            for vehicle in snapshot])
+    if all(type(vehicle_id) is int for vehicle_id in ids):
+        return "int", len(ids), array("q", ids).tobytes(), times.tobytes()
+    if all(type(vehicle_id) is str for vehicle_id in ids):
+        return "str", len(ids), "\n".join(ids).encode(), times.tobytes()
+    raise ValueError("vehicle IDs must be all ints or all strings to be checkpointed")
+
+
+def _histogram_state(hist):
+    # Sparse buckets: most of the ~1000 are empty
+    return {
+        "buckets": [[index, count] for index, count in enumerate(hist.counts) if count],
+        "count": hist.count,
+        "total": hist.total,
+        "min": hist.min if hist.count else None,
+        "max": hist.max,
+    }
+
+
+def _metrics_state(metrics):
+    return {
+        "total_vehicles_served": metrics.total_vehicles_served,
+        "vehicles_served_per_lane": dict(metrics.vehicles_served_per_lane),
+        "wait_histograms": {lane_id: _histogram_state(hist) for lane_id, hist in metrics.wait_histograms.items()},
+    }
+
+
+class Checkpointer:
+    def __init__(self, intersection, path, metrics=None, reader=None):
+        self.intersection = intersection
+        self.path = path
+        self.metrics = metrics
+        self.reader = reader
+
+        self.lanes = _lanes(intersection)
+        # Lanes changed since their section was last encoded; all of them to begin with
+        self._dirty = {lane.lane_id for lane in self.lanes}
+        self._sections = {}  # lane_id -> (kind, count, id bytes, time bytes)
+        for lane in self.lanes:
+            lane.listeners.append(self._lane_changed)
+
+        self._thread = None
+        self.error = None
+        self.checkpoints = 0
+        self.last_write_ms = None  # encode + write time of the last checkpoint, on the writer thread
+
+    def _lane_changed(self, lane):
+        self._dirty.add(lane.lane_id)
+
+    def checkpoint(self, step_count=0):
+        """
+        Takes a checkpoint and writes it in the background. Waits for the previous
+        write first, so at most one is in flight.
+        """
+        self.wait()
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+        changed = {lane.lane_id: _snapshot_lane(lane) for lane in self.lanes if lane.lane_id in self._dirty}
+        self._dirty.clear()
+
+        header = {
+            "step": step_count,
+            "byteorder": sys.byteorder,
+            "clock": self.lanes[0].clock(),
+            "wall": time.time(),
+            "lights": {lane.lane_id: lane.light.state for lane in self.lanes if lane.light is not None},
+            # Derived from the queues again on restore, kept for the record
+            "priority_lane": getattr(self.intersection.get_active_priority_lane(), "lane_id", None),
+            "controller": {name: getattr(self.intersection.controller, name)
+                           for name in CONTROLLER_STATE if hasattr(self.intersection.controller, name)},
+            "metrics": _metrics_state(self.metrics) if self.metrics is not None else None,
+            "reader": self.reader.state() if hasattr(self.reader, "state") else None,
+        }
+        self._thread = threading.Thread(target=self._write, args=(header, changed),
+                                        name="checkpoint-writer", daemon=True)
+        self._thread.start()
+
+    def _write(self, header, changed):
+        start = time.perf_counter()
+        try:
+            for lane_id, snapshot in changed.items():
+                self._sections[lane_id] = _encode_lane(snapshot)
+
+            header["lanes"] = []
+            chunks = []
+            for lane in self.lanes:
+                kind, count, id_bytes, time_bytes = self._sections[lane.lane_id]
+                header["lanes"].append({"lane": lane.lane_id, "kind": kind, "count": count,
+                                        "ids": len(id_bytes), "times": len(time_bytes)})
+                chunks += (id_bytes, time_bytes)
+            header_bytes = json.dumps(header).encode()
+
+            crc = zlib.crc32(header_bytes)
+            for chunk in chunks:
+                crc = zlib.crc32(chunk, crc)
+
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(PRELUDE.pack(MAGIC, VERSION, len(header_bytes), crc))
+                f.write(header_bytes)
+                for chunk in chunks:
+                    f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self.checkpoints += 1
+        except Exception as e:
+            # Re-raised on the loop's thread by the next checkpoint() / close()
+            self.error = e
+            # The cached sections may be half updated; re-encode everything next time
+            self._sections.clear()
+            self._dirty.update(lane.lane_id for lane in self.lanes)
+        self.last_write_ms = (time.perf_counter() - start) * 1000
+
+    def wait(self):
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        """
+        Waits for the last write and stops tracking the lanes
+        """
+        self.wait()
+        for lane in self.lanes:
+            lane.listeners.remove(self._lane_changed)
+        if self.error is not None:
+            raise self.error
+
+
+def _restore_histogram(hist, state):
+    for index, count in state["buckets"]:
+        hist.counts[index] = count
+    hist.count = state["count"]
+    hist.total = state["total"]
+    hist.min = math.inf if state["min"] is None else state["min"]
+    hist.max = state["max"]
+
+
+def _restore_metrics(metrics, state):
+    metrics.total_vehicles_served = state["total_vehicles_served"]
+    metrics.vehicles_served_per_lane = dict(state["vehicles_served_per_lane"])
+    metrics.wait_histograms = {}
+    for lane_id, hist_state in state["wait_histograms"].items():
+        hist = metrics.wait_histograms[lane_id] = LatencyHistogram()
+        _restore_histogram(hist, hist_state)
+
+
+def read_checkpoint(path):
+    """
+    Returns (header, sections) with sections a memoryview of the lane data. Raises
+    ValueError if the file isn't a checkpoint or is damaged.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < PRELUDE.size:
+        raise ValueError(f"{path} is too short to be a checkpoint")
+    magic, version, header_len, crc = PRELUDE.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a checkpoint")
+    if version != VERSION:
+        raise ValueError(f"{path} is checkpoint format {version}, expected {VERSION}")
+    body = memoryview(data)[PRELUDE.size:]
+    if zlib.crc32(body) != crc:
+        raise ValueError(f"{path} is damaged (checksum mismatch)")
+    header = json.loads(bytes(body[:header_len]))
+    return header, body[header_len:]
+
+
+def restore(path, intersection, metrics=None, reader=None):
+    """
+    Loads a checkpoint into intersection (and metrics / reader if given), replacing
+    whatever its lanes hold. Returns the checkpoint header ("step" is the step it was taken at).
+
+    Arrival times and the controller's phase start are moved onto this process's
+    lane clock, with the time between the checkpoint and now (wall clock) counting
+    as waiting.
+    """
+    header, sections = read_checkpoint(path)
+    lanes = {lane.lane_id: lane for lane in _lanes(intersection)}
+    swap = header["byteorder"] != sys.byteorder
+
+    # The clock the times were stamped with may have restarted since (time.monotonic does on reboot)
+    downtime = max(time.time() - header["wall"], 0.0)
+    shift = next(iter(lanes.values())).clock() - header["clock"] - downtime
+
+    offset = 0
+    for entry in header["lanes"]:
+        id_bytes = sections[offset:offset + entry["ids"]]
+        offset += entry["ids"]
+        times = array("d")
+        times.frombytes(sections[offset:offset + entry["times"]])
+        offset += entry["times"]
+
+        lane = lanes.get(entry["lane"])
+        if lane is None:
+            raise ValueError(f"checkpoint has lane {entry['lane']} which this intersection doesn't")
+
+        if entry["kind"] == "int":
+            ids = array("q")
+            ids.frombytes(id_bytes)
+            if swap:
+                ids.byteswap()
+        else:
+            ids = bytes(id_bytes).decode().split("\n") if entry["count"] else []
+        if swap:
+            times.byteswap()
+        if shift:
+            times = array("d", [t + shift for t in times])
+
+        # A fresh queue of the same kind, filled in bulk
+        if isinstance(lane.queue, ColumnQueue):
+            lane.queue.clear()
+        queue = lane.queue = type(lane.queue)(lane.queue.capacity)
+        if isinstance(queue, ColumnQueue) and entry["kind"] == "int":
+            queue.extend_columns(ids, times)
+        else:
+            # Millions of new objects would set off the cyclic GC over and over, and
+            # none of them can be garbage yet
+            gc_was_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                if math.isnan(math.fsum(times)):
+                    # Some vehicles were never stamped (NaN); they get None back
+                    vehicles = [Vehicle(vehicle_id, None if t != t else t) for vehicle_id, t in zip(ids, times)]
+                else:
+                    vehicles = list(map(Vehicle, ids, times))
+                queue.extend(vehicles)
+            finally:
+                if gc_was_enabled:
+                    gc.enable()
+        # One notification per lane brings the intersection's aggregates and the scheduler up to date
+        for listener in lane.listeners:
+            listener(lane)
+
+    for lane_id, state in header["lights"].items():
+        light = lanes[lane_id].light
+        if light is not None:
+            light.state = state
+    for name, value in header["controller"].items():
+        if name == "phase_start" and value is not None:
+            # A time on the old clock, like the arrival times
+            value += shift
+        if hasattr(intersection.controller, name):
+            setattr(intersection.controller, name, value)
+    if metrics is not None and header["metrics"] is not None:
+        _restore_metrics(metrics, header["metrics"])
+    if reader is not None and header["reader"] is not None and hasattr(reader, "restore_state"):
+        reader.restore_state(header["reader"])
+    return header
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Show what a checkpoint file holds")
+    parser.add_argument("path")
+    args = parser.parse_args()
+
+    header, _ = read_checkpoint(args.path)
+    print(f"Step {header['step']}, taken {time.ctime(header['wall'])}")
+    for entry in header["lanes"]:
+        if entry["count"]:
+            print(f"{entry['lane']}: {entry['count']} vehicles ({entry['kind']} IDs)")
+    print(f"Lights: {header['lights']}, active priority lane: {header['priority_lane']}")
+    if header["controller"]:
+        print(f"Controller: {header['controller']}")
+    if header["metrics"] is not None:
+        print(f"Vehicles served: {header['metrics']['total_vehicles_served']}")
+    if header["reader"]:
+        print(f"Reader: {header['reader']}")
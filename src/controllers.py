@@ -0,0 +1,293 @@
+"""
+Signal controllers: the policy deciding which road gets the green light.
+
+Intersection.step (headless simulator, event engine, road network) and the
+visualizer's tick both ask a controller the same question:
+
+    controller.decide(queues, now) -> [(road_id, vehicles), ...]
+
+queues maps each road ID to the vehicles waiting at its stop line, and now is
+the time in seconds. The answer is the phases to run next, in order: give
+road_id the green for up to `vehicles` vehicles (None means everything waiting).
+Intersection serves every phase of the plan in one step. The visualizer asks
+again on every tick, so only the first phase's road matters there.
+
+Controllers whose answer changes as time passes, not only when the queues do,
+also have next_decision(now): the time their plan changes next. The event engine
+wakes the signal up then even if nothing arrives.
+
+Controllers:
+
+- PriorityController: Intersection's original rules (the default there)
+- HysteresisController: the visualizer's original rules (the default there)
+- FixedTimeController: plain round robin on a timer
+- LongestQueueController: green for the longest queue
+- MaxPressureController: green for the largest queue minus what's queued downstream
+
+Run this module to compare them on the same seeded arrivals.
+"""
+import math
+import time
+
+# Time comparisons allow for float error, e.g. 300 ticks of 1/60 s adding up to 5.000000001
+EPSILON = 1e-9
+
+
+class PriorityController:
+    """
+    Intersection's rules: once the priority road has more than threshold vehicles
+    it is served down to drain_to and nothing else moves. Otherwise every other
+    road with vehicles serves up to the average queue length (at least 1); the
+    priority road is left alone while it has any vehicles at all.
+    """
+
+    def __init__(self, priority_road="A", threshold=5, drain_to=5, scheduler=None):
+        """
+        scheduler: a LaneScheduler of L2 lanes; when given, the priority road is the
+        one of whatever lane it puts on top (Intersection passes its priority_queue)
+        """
+        if drain_to > threshold:
+            raise ValueError("drain_to can't be above threshold")
+        self.priority_road = priority_road
+        self.threshold = threshold
+        self.drain_to = drain_to
+        self.scheduler = scheduler
+
+    def priority(self, queues):
+        if self.scheduler is not None:
+            lane = self.scheduler.peek()
+            return lane.lane_id[:-2] if lane is not None else None
+        return self.priority_road if queues.get(self.priority_road, 0) > 0 else None
+
+    def active_road(self, queues):
+        """
+        The priority road if it is over threshold (so decide serves only it), else None
+        """
+        priority = self.priority(queues)
+        return priority if priority is not None and queues[priority] > self.threshold else None
+
+    def decide(self, queues, now):
+        priority = self.priority(queues)
+        if priority is not None and queues[priority] > self.threshold:
+            return [(priority, queues[priority] - self.drain_to)]
+
+        # Average across all lanes, priority one included (normal_service_count)
+        vehicles = max(sum(queues.values()) // len(queues), 1) if queues else 1
+        return [(road_id, vehicles) for road_id, size in queues.items()
+                if size > 0 and road_id != priority]
+
+
+class FixedTimeController:
+    """
+    Round robin: each road in order gets the green for period seconds
+    """
+
+    def __init__(self, order=("A", "D", "C", "B"), period=5.0, time_per_vehicle=1):
+        self.order = list(order)
+        self.period = period
+        self.time_per_vehicle = time_per_vehicle
+        self.current = 0
+        self.phase_start = 0.0
+
+    def _advance(self, now):
+        # Switch once the phase has run for longer than period
+        if now - self.phase_start > self.period + EPSILON:
+            self.current = (self.current + 1) % len(self.order)
+            self.phase_start = now
+
+    def next_decision(self, now):
+        # The phase switches at the first step after it has run for period
+        return self.phase_start + self.period
+
+    def decide(self, queues, now):
+        self._advance(now)
+        # Vehicles that fit in what's left of the phase
+        remaining = self.period - (now - self.phase_start)
+        return [(self.order[self.current], max(math.ceil(remaining / self.time_per_vehicle), 1))]
+
+
+class HysteresisController(FixedTimeController):
+    """
+    The visualizer's rules: round robin, but once the priority road has more than
+    on vehicles it stays green until it's down to off. The round-robin timer
+    restarts after every priority tick.
+    """
+
+    def __init__(self, priority_road="A", on=10, off=5, order=("A", "D", "C", "B"), period=5.0):
+        super().__init__(order, period)
+        self.priority_road = priority_road
+        self.on = on
+        self.off = off
+        self.priority_active = False
+
+    def active_road(self, queues):
+        return self.priority_road if self.priority_active else None
+
+    def decide(self, queues, now):
+        waiting = queues.get(self.priority_road, 0)
+        # Activate above on, deactivate only once down to off
+        if not self.priority_active and waiting > self.on:
+            self.priority_active = True
+        elif self.priority_active and waiting <= self.off:
+            self.priority_active = False
+
+        if self.priority_active:
+            self.current = self.order.index(self.priority_road)
+            self.phase_start = now
+            return [(self.priority_road, None)]
+
+        self._advance(now)
+        return [(self.order[self.current], None)]
+
+
+class LongestQueueController:
+    """
+    Green for the road with the most vehicles waiting. A road keeps the green for
+    at least min_green seconds so the lights don't flicker between similar queues.
+    """
+
+    def __init__(self, min_green=2.0):
+        self.min_green = min_green
+        self.current = None
+        self.phase_start = 0.0
+
+    def score(self, road_id, size):
+        return size
+
+    def decide(self, queues, now):
+        if self.current is not None and now - self.phase_start < self.min_green - EPSILON \
+                and queues.get(self.current, 0) > 0:
+            return [(self.current, None)]
+
+        best = None
+        best_score = 0
+        for road_id, size in queues.items():
+            score = self.score(road_id, size)
+            if size > 0 and (best is None or score > best_score):
+                best, best_score = road_id, score
+        if best is None:
+            return []
+        if best != self.current:
+            self.current = best
+            self.phase_start = now
+        return [(best, None)]
+
+
+class MaxPressureController(LongestQueueController):
+    """
+    Green for the road with the highest pressure: vehicles waiting minus vehicles
+    already queued where they're headed. downstream maps road IDs to the lanes
+    their traffic feeds (RoadNetwork fills it in); roads missing from it lead out
+    of the network, so this is longest-queue-first on a lone intersection.
+    """
+
+    def __init__(self, min_green=2.0, downstream=None):
+        super().__init__(min_green)
+        self.downstream = downstream or {}
+
+    def score(self, road_id, size):
+        lane = self.downstream.get(road_id)
+        return size - lane.size() if lane is not None else size
+
+
+CONTROLLERS = {
+    "priority": PriorityController,
+    "hysteresis": HysteresisController,
+    "fixed-time": FixedTimeController,
+    "longest-queue": LongestQueueController,
+    "max-pressure": MaxPressureController,
+}
+
+
+def make_controller(name, threshold=None, drain_to=None, period=None, time_per_vehicle=None,
+                    min_green=None, on=None, off=None):
+    """
+    Builds a controller by name from the knobs the sweep and the command lines use.
+    Knobs left as None (or that the controller doesn't have) keep its defaults.
+    """
+    if name not in CONTROLLERS:
+        raise ValueError(f"unknown controller: {name}")
+    knobs = {
+        "priority": {"threshold": threshold, "drain_to": drain_to},
+        "hysteresis": {"on": on, "off": off, "period": period},
+        "fixed-time": {"period": period, "time_per_vehicle": time_per_vehicle},
+        "longest-queue": {"min_green": min_green},
+        "max-pressure": {"min_green": min_green},
+    }[name]
+    return CONTROLLERS[name](**{key: value for key, value in knobs.items() if value is not None})
+
+
+class TimedController:
+    """
+    Wraps a controller and adds up the CPU time spent in decide() (this thread's,
+    so other threads and a busy machine don't count)
+    """
+
+    def __init__(self, controller):
+        self.controller = controller
+        self.decisions = 0
+        self.elapsed_ns = 0
+
+    def decide(self, queues, now):
+        start = time.thread_time_ns()
+        plan = self.controller.decide(queues, now)
+        self.elapsed_ns += time.thread_time_ns() - start
+        self.decisions += 1
+        return plan
+
+    def __getattr__(self, name):
+        return getattr(self.controller, name)
+
+
+def benchmark(names, seeds, duration=86400, time_per_vehicle=1):
+    """
+    Runs every controller headless on the same seeded arrivals. Returns
+    {name: {...}} with the mean CPU time per decision and vehicles served per hour.
+    """
+    # Imported here: intersection.py imports this module
+    from event_engine import EventEngine
+    from intersection import Intersection
+    from metrics import Metrics
+
+    results = {}
+    for name in names:
+        decisions = 0
+        elapsed_ns = 0
+        served = 0
+        waits = []
+        for seed in seeds:
+            controller = TimedController(make_controller(name, time_per_vehicle=time_per_vehicle))
+            metrics = Metrics(time_per_vehicle=time_per_vehicle)
+            intersection = Intersection(metrics=metrics, controller=controller)
+            report = EventEngine(intersection, metrics, seed=seed).run(duration)
+            decisions += controller.decisions
+            elapsed_ns += controller.elapsed_ns
+            served += report["vehicles_served"]
+            waits.append(report["wait_percentiles"][95])
+
+        known = [w for w in waits if w is not None]
+        results[name] = {
+            "decisions": decisions,
+            "ns_per_decision": elapsed_ns / decisions if decisions else None,
+            "served_per_hour": served * 3600 / (duration * len(seeds)),
+            "p95_wait": sum(known) / len(known) if known else None,
+        }
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare signal controllers on identical seeded arrivals")
+    parser.add_argument("--controllers", default=",".join(CONTROLLERS),
+                        help="comma separated controller names")
+    parser.add_argument("--seeds", type=int, default=5, help="number of seeds (0..N-1)")
+    parser.add_argument("--duration", type=float, default=86400, help="simulated seconds per run")
+    args = parser.parse_args()
+
+    results = benchmark(args.controllers.split(","), range(args.seeds), args.duration)
+    print(f"{'controller':>14}  {'decisions':>10}  {'ns/decision':>11}  {'served/h':>9}  {'p95 wait':>8}")
+    for name, r in results.items():
+        p95 = f"{r['p95_wait']:.1f}s" if r["p95_wait"] is not None else "-"
+        print(f"{name:>14}  {r['decisions']:>10}  {r['ns_per_decision']:>11.0f}  "
+              f"{r['served_per_hour']:>9.1f}  {p95:>8}")
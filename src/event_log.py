@@ -0,0 +1,168 @@
+"""
+Structured event logging for the simulation's hot loops.
+
+The intersection used to print() every removed vehicle and every light change.
+Now it emits named events through an EventLog instead:
+
+- every event kind has a level; anything below the log's level is dropped
+- each kind can be sampled (e.g. keep 1% of "vehicle_removed")
+- formatting and I/O happen in the sink; AsyncSink does both on a background
+  thread and writes in batches
+
+Callers check wants(kind) once before a loop, so with logging off a step only
+pays for the scheduling work itself.
+"""
+import queue
+import sys
+import threading
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+OFF = 100
+
+LEVEL_NAMES = {"debug": DEBUG, "info": INFO, "warning": WARNING, "off": OFF}
+
+# Default level per event kind
+EVENT_LEVELS = {
+    "vehicle_removed": INFO,
+    "green_light": INFO,
+    "no_arrivals": INFO,
+}
+
+
+def _format(kind, fmt, args):
+    return "[LOG] " + (fmt % args if args else fmt)
+
+
+class StdoutSink:
+    """
+    Prints straight away, so log lines stay in order with the rest of the output
+    """
+
+    def write(self, kind, fmt, args):
+        print(_format(kind, fmt, args))
+
+    def close(self):
+        pass
+
+
+class AsyncSink:
+    """
+    Hands events to a background thread which formats them and writes them in
+    batches to a file (or stdout when path is None).
+    """
+
+    BATCH = 1024
+
+    def __init__(self, path=None):
+        self.stream = open(path, "a") if path else sys.stdout
+        self.owns_stream = path is not None
+        self.queue = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self._drain, name="event-log", daemon=True)
+        self.thread.start()
+
+    def write(self, kind, fmt, args):
+        self.queue.put((kind, fmt, args))
+
+    def _drain(self):
+        while True:
+            item = self.queue.get()
+            batch = []
+            # Grab whatever else is already waiting, up to a batch
+            while item is not None:
+                batch.append(_format(*item))
+                if len(batch) >= self.BATCH:
+                    break
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self.stream.write("\n".join(batch))
+                self.stream.write("\n")
+                self.stream.flush()
+            if item is None:
+                return
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        if self.owns_stream:
+            self.stream.close()
+
+
+class EventLog:
+    def __init__(self, level=INFO, sink=None, sample=None, levels=None):
+        """
+        level:  minimum level that gets logged (OFF disables everything)
+        sink:   StdoutSink by default
+        sample: {kind: rate}, e.g. {"vehicle_removed": 0.01} keeps every 100th event
+        levels: overrides for EVENT_LEVELS
+        """
+        self.level = level
+        self.sink = sink if sink is not None else StdoutSink()
+        self.levels = dict(EVENT_LEVELS)
+        if levels:
+            self.levels.update(levels)
+
+        # Sampling keeps every n-th event of a kind
+        self.every = {}
+        for kind, rate in (sample or {}).items():
+            self.every[kind] = max(int(round(1 / rate)), 1) if rate > 0 else 0
+        self.seen = {}
+
+        self._wants = {}
+
+    @classmethod
+    def disabled(cls):
+        return cls(level=OFF)
+
+    def wants(self, kind):
+        """
+        True if events of this kind can be logged at all. Cheap enough to call per step.
+        """
+        wanted = self._wants.get(kind)
+        if wanted is None:
+            wanted = self.levels.get(kind, INFO) >= self.level and self.every.get(kind, 1) != 0
+            self._wants[kind] = wanted
+        return wanted
+
+    def emit(self, kind, fmt, *args):
+        """
+        Logs an event. fmt uses %-style placeholders and is only formatted by the sink.
+        """
+        if not self.wants(kind):
+            return
+        every = self.every.get(kind, 1)
+        if every > 1:
+            seen = self.seen.get(kind, 0) + 1
+            self.seen[kind] = seen
+            if seen % every:
+                return
+        self.sink.write(kind, fmt, args)
+
+    def close(self):
+        self.sink.close()
+
+
+def parse_sample(specs):
+    """
+    Turns ["vehicle_removed=0.01", ...] (from the command line) into {kind: rate}
+    """
+    sample = {}
+    for spec in specs or ():
+        kind, _, rate = spec.partition("=")
+        sample[kind] = float(rate)
+    return sample
+
+
+def from_args(level="info", log_file=None, sample=None, async_stdout=False):
+    """
+    Builds an EventLog from command line style options
+    """
+    level = LEVEL_NAMES[level]
+    if level == OFF:
+        return EventLog.disabled()
+    sink = AsyncSink(log_file) if (log_file or async_stdout) else StdoutSink()
+    return EventLog(level=level, sink=sink, sample=parse_sample(sample))
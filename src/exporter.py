@@ -0,0 +1,214 @@
+"""
+Exports metrics while the simulation runs, without slowing the loop down.
+
+The simulation loop only calls publish(), which (at most once per interval)
+copies the counters, queue lengths, light states and priority state into a fresh
+snapshot and swaps it in as the latest one. Everything slow happens on
+background threads working from that snapshot:
+
+- a writer thread appends snapshots to a JSONL file, rotating it by size
+- a small HTTP server on localhost serves the latest snapshot in the
+  Prometheus text format at /metrics
+"""
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MetricsExporter:
+    def __init__(self, intersection, metrics=None, jsonl_path=None, port=None,
+                 interval=1.0, max_bytes=10 * 1024 * 1024):
+        self.intersection = intersection
+        self.metrics = metrics if metrics is not None else intersection.metrics
+        self.jsonl_path = jsonl_path
+        self.port = port
+        self.interval = interval
+        self.max_bytes = max_bytes
+
+        # Double buffering: the loop builds the next snapshot from scratch while the
+        # threads keep reading the latest one, then the two are swapped under the lock
+        self._latest = None
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._last_publish = 0.0
+
+        self._stop = threading.Event()
+        self._threads = []
+        self._server = None
+
+    # ---------------- simulation side ----------------
+
+    def publish(self, step, force=False):
+        """
+        Called from the simulation loop. Cheap: returns straight away unless a
+        snapshot is due.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_publish < self.interval:
+            return
+        self._last_publish = now
+
+        snapshot = self._capture(step)
+        with self._lock:
+            self._seq += 1
+            self._latest = (self._seq, snapshot)
+
+    def _capture(self, step):
+        queue_lengths = {}
+        lights = {}
+        for road in self.intersection.roads.values():
+            for lane in (road.L1, road.L2, road.L3):
+                queue_lengths[lane.lane_id] = lane.size()
+                if lane.light is not None:
+                    lights[lane.lane_id] = str(lane.light)
+
+        priority = self.intersection.get_active_priority_lane()
+        snapshot = {
+            "timestamp": time.time(),
+            "step": step,
+            "queue_lengths": queue_lengths,
+            "lights": lights,
+            "priority_lane": priority.lane_id if priority else None,
+        }
+        if self.metrics is not None:
+            snapshot["total_vehicles_served"] = self.metrics.total_vehicles_served
+            snapshot["vehicles_served_per_lane"] = dict(self.metrics.vehicles_served_per_lane)
+            # Histogram copies are just a few list copies; percentiles get worked out off-thread
+            snapshot["wait_histograms"] = {
+                lane_id: hist.copy() for lane_id, hist in self.metrics.wait_histograms.items()
+            }
+        return snapshot
+
+    def latest(self):
+        with self._lock:
+            return self._latest
+
+    # ---------------- background side ----------------
+
+    def start(self):
+        if self.jsonl_path:
+            writer = threading.Thread(target=self._write_loop, name="metrics-jsonl", daemon=True)
+            writer.start()
+            self._threads.append(writer)
+
+        if self.port is not None:
+            self._server = ThreadingHTTPServer(("127.0.0.1", self.port), self._handler_class())
+            server = threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True)
+            server.start()
+            self._threads.append(server)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def _write_loop(self):
+        written = 0
+        while True:
+            stopping = self._stop.wait(self.interval)
+            latest = self.latest()
+            if latest is not None and latest[0] != written:
+                written = latest[0]
+                self._append_jsonl(to_json_record(latest[1]))
+            if stopping:
+                return
+
+    def _append_jsonl(self, record):
+        path = self.jsonl_path
+        if os.path.exists(path) and os.path.getsize(path) >= self.max_bytes:
+            os.replace(path, path + ".1")
+        with open(path, "a") as f:
+            f.write(json.dumps(record))
+            f.write("\n")
+
+    def _handler_class(self):
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                latest = exporter.latest()
+                body = to_prometheus(latest[1] if latest else None).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # keep the terminal for the simulation
+
+        return Handler
+
+
+def _wait_summary(snapshot):
+    summary = {}
+    for lane_id, hist in snapshot.get("wait_histograms", {}).items():
+        if hist.count:
+            summary[lane_id] = {
+                "count": hist.count,
+                "sum": hist.total,
+                "p50": hist.percentile(50),
+                "p95": hist.percentile(95),
+                "p99": hist.percentile(99),
+            }
+    return summary
+
+
+def to_json_record(snapshot):
+    record = {key: value for key, value in snapshot.items() if key != "wait_histograms"}
+    record["wait_seconds"] = _wait_summary(snapshot)
+    return record
+
+
+def to_prometheus(snapshot):
+    """
+    Renders a snapshot in the Prometheus text exposition format
+    """
+    if snapshot is None:
+        return ""
+
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            label_str = ",".join(f'{k}="{v}"' for k, v in labels.items())
+            lines.append(f"{name}{{{label_str}}} {value}" if label_str else f"{name} {value}")
+
+    metric("traffic_step", "gauge", "Current simulation step",
+           [({}, snapshot["step"])])
+    if "total_vehicles_served" in snapshot:
+        metric("traffic_vehicles_served_total", "counter", "Vehicles served across all lanes",
+               [({}, snapshot["total_vehicles_served"])])
+        metric("traffic_lane_vehicles_served_total", "counter", "Vehicles served per lane",
+               [({"lane": lane}, count) for lane, count in snapshot["vehicles_served_per_lane"].items()])
+    metric("traffic_lane_queue_length", "gauge", "Vehicles waiting per lane",
+           [({"lane": lane}, size) for lane, size in snapshot["queue_lengths"].items()])
+    metric("traffic_light_green", "gauge", "1 if the lane's light is green",
+           [({"lane": lane}, int(state == "GREEN")) for lane, state in snapshot["lights"].items()])
+    metric("traffic_priority_active", "gauge", "1 while a priority lane is being served",
+           [({}, int(snapshot["priority_lane"] is not None))])
+
+    waits = _wait_summary(snapshot)
+    if waits:
+        samples = []
+        for lane, stats in waits.items():
+            for quantile in (50, 95, 99):
+                samples.append(({"lane": lane, "quantile": quantile / 100}, stats[f"p{quantile}"]))
+        metric("traffic_lane_wait_seconds", "summary", "Time vehicles spent queued", samples)
+        for lane, stats in waits.items():
+            lines.append(f'traffic_lane_wait_seconds_sum{{lane="{lane}"}} {stats["sum"]}')
+            lines.append(f'traffic_lane_wait_seconds_count{{lane="{lane}"}} {stats["count"]}')
+
+    return "\n".join(lines) + "\n"
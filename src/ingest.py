@@ -0,0 +1,72 @@
+"""
+Background arrival ingestion for the visualizer's render loop.
+
+Reading a transport means file system calls (exists/getsize/open/truncate for
+the lane files) on every poll. ArrivalIngestor does that on its own thread and
+hands what it finds to the render loop through a deque: the thread appends,
+the loop pops, and both are atomic in CPython, so neither side takes a lock.
+Draining costs O(new arrivals), however slow the disk is.
+
+Timings are kept in milliseconds, in LatencyHistograms:
+
+- read_ms: how long one poll of all lanes took (ingest thread)
+- latency_ms: from the thread picking a vehicle up to the loop taking it (handoff)
+"""
+import threading
+import time
+from collections import deque
+
+from metrics import LatencyHistogram
+from transport import LANES
+
+
+class ArrivalIngestor:
+    def __init__(self, reader, lanes=LANES, poll_interval=0.05):
+        self.reader = reader
+        self.lanes = list(lanes)
+        self.poll_interval = poll_interval
+
+        self.handoff = deque()  # (lane_id, vehicle_ids, picked up at) batches
+        self.read_ms = LatencyHistogram()     # only touched by the ingest thread
+        self.latency_ms = LatencyHistogram()  # only touched by the draining thread
+
+        self._stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="arrival-ingest", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            start = time.perf_counter()
+            for lane_id in self.lanes:
+                vehicle_ids = self.reader.read_new(lane_id)
+                if vehicle_ids:
+                    self.handoff.append((lane_id, vehicle_ids, time.perf_counter()))
+            self.read_ms.record((time.perf_counter() - start) * 1000)
+            self._stop.wait(self.poll_interval)
+
+    def drain(self):
+        """
+        Returns [(lane_id, vehicle_ids), ...] ingested since the last call
+        """
+        batches = []
+        now = time.perf_counter()
+        # Only this side pops, so a non-empty deque can't be emptied under us
+        while self.handoff:
+            lane_id, vehicle_ids, picked_up = self.handoff.popleft()
+            batches.append((lane_id, vehicle_ids))
+            wait = (now - picked_up) * 1000
+            for _ in vehicle_ids:
+                self.latency_ms.record(wait)
+        return batches
+
+    def stop(self):
+        """
+        Stops the thread and closes the reader
+        """
+        self._stop.set()
+        if self.thread.is_alive():
+            self.thread.join()
+        self.reader.close()
@@ -1,30 +1,110 @@
-from priority_queue import LanePriorityQueue
+from controllers import PriorityController
+from event_log import EventLog
+from priority_queue import LanePriorityQueue, LaneScheduler
 from road import Road
 from metrics import Metrics
 
+
+def wait_time(vehicle, now):
+    """
+    How long a vehicle queued, or None if it was never stamped by Lane.add_vehicle
+    """
+    if vehicle.arrival_time is None:
+        return None
+    return now - vehicle.arrival_time
+
+
+ROAD_IDS = ("A", "B", "C", "D")
+
+
 class Intersection:
-    def __init__(self, metrics: Metrics = None):
-        # Initializing 4 roads
-        self.roads = {"A": Road("A"), "B": Road("B"), "C": Road("C"), "D": Road("D")}
+    def __init__(self, metrics: Metrics = None, event_log: EventLog = None,
+                 priority_queue: LaneScheduler = None, road_ids=ROAD_IDS,
+                 priority_threshold=5, priority_drain_to=5, controller=None, **lane_options):
+        # The priority lane takes over once it has more than priority_threshold
+        # vehicles and is then served until it is down to priority_drain_to
+        if priority_drain_to > priority_threshold:
+            raise ValueError("priority_drain_to can't be above priority_threshold")
+        self.priority_threshold = priority_threshold
+        self.priority_drain_to = priority_drain_to
+
+        # Initializing the roads, 4 by default (lane_options such as capacity/compact go down to every Lane)
+        self.roads = {rid: Road(rid, **lane_options) for rid in road_ids}
 
-        # Priority Queue for AL2 lane only
-        self.priority_queue = LanePriorityQueue()
-        self.priority_queue.register_lane(self.roads["A"].L2)
+        # Running aggregates over the L2 lanes, kept up to date by the lanes themselves
+        # so scheduling decisions don't have to rescan every road
+        self.lane_sizes = {}
+        self.road_queues = {}  # road_id -> L2 size, the same numbers keyed for controllers
+        self.normal_lane_count = 0
+        self._normal_total = 0
+        for road in self.roads.values():
+            self.lane_sizes[road.L2.lane_id] = road.L2.size()
+            self.road_queues[road.road_id] = road.L2.size()
+            self._normal_total += road.L2.size()
+            self.normal_lane_count += 1
+            road.L2.listeners.append(self._lane_changed)
+        # Lane whose clock step() hands the controller (they all share one); None without roads
+        self._clock_lane = next(iter(self.roads.values())).L2 if self.roads else None
+
+        # Priority Queue, AL2 lane only unless a different scheduler is passed in.
+        # Every lane is offered to it; the scheduler decides which ones it keeps
+        self.priority_queue = priority_queue if priority_queue is not None else LanePriorityQueue()
+        for road in self.roads.values():
+            for lane in (road.L1, road.L2, road.L3):
+                self.priority_queue.register_lane(lane)
 
         # Metrics object
         self.metrics = metrics
-        
+
+        # Signal policy (see controllers.py). The default keeps the rules above, with the
+        # priority lane picked by priority_queue
+        if controller is None:
+            # It serves roads through their L2 lane, so an L1/L3 lane on top of the
+            # scheduler would have the wrong lane served
+            others = [lane.lane_id for lane in self.priority_queue.lanes() if not self._is_normal_lane(lane)]
+            if others:
+                raise ValueError(f"the priority controller only serves L2 lanes, priority_queue holds {', '.join(others)}")
+            controller = PriorityController(
+                threshold=priority_threshold, drain_to=priority_drain_to, scheduler=self.priority_queue
+            )
+        self.controller = controller
+
+        # Where green light / removed vehicle events go (stdout unless told otherwise)
+        self.events = event_log if event_log is not None else EventLog()
+
+        # Optional callback(lane, vehicle) for every served vehicle, e.g. a road
+        # network handing it on to the next intersection. Otherwise served vehicles just leave
+        self.departure_handler = None
+
+    def queued_vehicles(self):
+        """
+        Number of vehicles waiting in the L2 lanes, O(1)
+        """
+        return self._normal_total
+
+    def _lane_changed(self, lane):
+        """
+        Listener on every L2 lane: folds the size change into the running total
+        """
+        size = lane.size()
+        self._normal_total += size - self.lane_sizes[lane.lane_id]
+        self.lane_sizes[lane.lane_id] = size
+        self.road_queues[lane.lane_id[:-2]] = size
+
+    def _is_normal_lane(self, lane):
+        if lane is None:
+            return False
+        road = self.roads.get(lane.lane_id[:-2])
+        return road is not None and road.L2 is lane
 
     def total_normal_vehicles_count(self, active_priority_lane=None):
         """
         Computing total number of vehicles across all normal lanes
         (excluding active priority lane)
         """
-        total = 0
-        for road in self.roads.values():
-            lane = road.L2
-            if lane is not active_priority_lane:
-                total += lane.size()
+        total = self._normal_total
+        if self._is_normal_lane(active_priority_lane):
+            total -= active_priority_lane.size()
         return total
 
     def normal_service_count(self, active_priority_lane=None):
@@ -32,11 +112,10 @@ class Intersection:
         Computing number of vehicles to serve from normal lanes
         """
         total = self.total_normal_vehicles_count(active_priority_lane)
-        n = 0
         # Counting number of normal lanes
-        for road in self.roads.values():
-            if road.L2 is not active_priority_lane:
-                n += 1
+        n = self.normal_lane_count
+        if self._is_normal_lane(active_priority_lane):
+            n -= 1
         if n == 0:
             return 1  # always serve at least 1
         avg = total // n
@@ -54,59 +133,49 @@ class Intersection:
             lane.light.set_green()
 
         # Log to track lane receiving green light
-        print(f"[LOG] Green light set for {lane.lane_id}")
-
-    def serve_priority_lane(self, lane=None):
-        """
-        Serve AL2 lane if it is priority until it has <= 5 vehicles
-        """
-        active_lane = self.priority_queue.peek()
-        if active_lane and active_lane.size() > 5:
-            self.set_green_lane(active_lane)
-            while active_lane.size() > 5:
-                removed_vehicle = active_lane.remove_vehicle()
-                # Metrics record if provided
-                if self.metrics and removed_vehicle:
-                    self.metrics.record_vehicle_served(active_lane.lane_id)
-                # Log to track when a vehicle is removed from priority lane
-                print(
-                    f"[LOG] Removed {removed_vehicle.vehicle_id} from {active_lane.lane_id}"
-                )
-            return True
-        return False
+        self.events.emit("green_light", "Green light set for %s", lane.lane_id)
 
-    def serve_normal_lanes(self):
+    def serve_lane(self, lane, vehicles=None):
         """
-        Serve all normal lanes according to normal service formula
+        Gives lane the green and serves up to `vehicles` of its vehicles (all of them if None)
         """
-        v = self.normal_service_count()
-        for road in self.roads.values():
-            lane = road.L2
-            if lane is self.priority_queue.peek():
-                continue #skip AL2
-            if lane.size() > 0:
-                self.set_green_lane(lane)
-                for _ in range(v):
-                    if lane.size() > 0:
-                        removed_vehicle = lane.remove_vehicle()
-                        # Metrics record if provided
-                        if self.metrics and removed_vehicle:
-                            self.metrics.record_vehicle_served(lane.lane_id)
-                        if removed_vehicle is not None:
-                            # Log to track when a vehicle is removed from normal lane
-                            print(
-                                f"[LOG] Removed {removed_vehicle.vehicle_id} from {lane.lane_id}"
-                            )
+        self.set_green_lane(lane)
+        now = lane.clock()
+        log_removed = self.events.wants("vehicle_removed")
+        hand_off = self.departure_handler
+        served = 0
+        while lane.size() > 0 and (vehicles is None or served < vehicles):
+            removed_vehicle = lane.remove_vehicle()
+            served += 1
+            # Metrics record if provided
+            if self.metrics:
+                self.metrics.record_vehicle_served(lane.lane_id, wait_time(removed_vehicle, now))
+            if hand_off:
+                hand_off(lane, removed_vehicle)
+            # Log to track when a vehicle is removed from a lane
+            if log_removed:
+                self.events.emit(
+                    "vehicle_removed", "Removed %s from %s",
+                    removed_vehicle.vehicle_id, lane.lane_id
+                )
+        return served
 
     def get_active_priority_lane(self):
-        lane = self.priority_queue.peek()
-        if lane and lane.size() > 5:
-            return lane
-        return None
+        """
+        L2 lane of the road the controller is giving priority to right now, or None
+        (always None for controllers without a priority mode)
+        """
+        active_road = getattr(self.controller, "active_road", None)
+        road_id = active_road(self.road_queues) if active_road is not None else None
+        return self.roads[road_id].L2 if road_id is not None else None
 
     def step(self):
         """
-        Simulation step: Serve priority lane first if active, else normal lanes
+        Simulation step: asks the controller for a plan and serves its phases in order.
+        The default controller serves the priority lane if active, else the normal lanes
         """
-        if not self.serve_priority_lane():
-            self.serve_normal_lanes()
+        if self._clock_lane is None:
+            return
+        now = self._clock_lane.clock()
+        for road_id, vehicles in self.controller.decide(self.road_queues, now):
+            self.serve_lane(self.roads[road_id].L2, vehicles)
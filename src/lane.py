@@ -1,5 +1,7 @@
+import time
 from typing import Optional
 
+from lane_store import ColumnQueue
 from queue_ds import Queue
 from traffic_light import TrafficLight
 
@@ -9,22 +11,37 @@ class Lane:
     This class represents a single traffic lane.
     Dumb by design - responsible for only managing its vehicle queue and traffic light reference.
     """
-    def __init__(self, lane_id):
+    def __init__(self, lane_id, capacity=None, compact=False, clock=time.monotonic):
         self.lane_id = lane_id
-        self.queue = Queue()
+        self.compact = compact
+        # Used to stamp vehicles on arrival; the headless engine swaps in its virtual clock
+        self.clock = clock
+        # capacity=None keeps the queue unbounded, otherwise it becomes a ring buffer.
+        # compact lanes keep integer IDs/arrival times in typed arrays instead of Vehicle objects
+        queue_cls = ColumnQueue if compact else Queue
+        self.queue = queue_cls(capacity)
         self.light: Optional[TrafficLight] = None
+        # Called with the lane whenever its size changes (e.g. a scheduler re-keying it)
+        self.listeners = []
 
     def add_vehicle(self, vehicle):
         """
-        Add a vehicle to the end of the lane queue
+        Add a vehicle to the end of the lane queue, stamping when it joined
         """
+        vehicle.arrival_time = self.clock()
         self.queue.enqueue(vehicle)
+        for listener in self.listeners:
+            listener(self)
 
     def remove_vehicle(self):
         """
         Remove and return the front vehicle from the queue.
         """
-        return self.queue.dequeue()
+        vehicle = self.queue.dequeue()
+        if vehicle is not None:
+            for listener in self.listeners:
+                listener(self)
+        return vehicle
 
     def size(self):
         """
@@ -0,0 +1,181 @@
+"""
+Array-backed (struct-of-arrays) storage for lane queues.
+
+Instead of one Vehicle object per queued car, a ColumnQueue keeps two typed
+columns: integer vehicle IDs and arrival timestamps. Vehicle objects are only
+created on the way out, so Lane.add_vehicle / remove_vehicle work the same.
+String IDs are interned (see vehicle.compact_vehicle_id) and come back out as
+the same strings.
+"""
+from array import array
+
+from vehicle import Vehicle, compact_vehicle_id, release_vehicle_id, vehicle_label
+
+# Arrival time stored for vehicles that never got one
+NO_TIME = float("nan")
+
+
+class ColumnQueue:
+    """
+    Drop-in replacement for queue_ds.Queue that stores columns instead of objects.
+    Same enqueue/dequeue/peek/size API, and also supports the ring-buffer capacity mode.
+    """
+
+    # Once this many slots at the front are dead, they get trimmed off
+    COMPACT_AFTER = 4096
+
+    def __init__(self, capacity=None):
+        self.capacity = capacity
+
+        if capacity is None:
+            self.ids = array("q")
+            self.arrival_times = array("d")
+        else:
+            if capacity <= 0:
+                raise ValueError("capacity must be a positive integer")
+            # Preallocate both columns, they're used as a ring buffer
+            self.ids = array("q", bytes(8 * capacity))
+            self.arrival_times = array("d", bytes(8 * capacity))
+        self._head = 0
+        self._count = 0
+        # Queued vehicles with an interned string ID (a negative code)
+        self.labelled = 0
+
+    def _slot(self, i):
+        # Physical index of the i-th queued vehicle
+        if self.capacity is None:
+            return self._head + i
+        return (self._head + i) % self.capacity
+
+    def _vehicle_at(self, slot):
+        vehicle_id = self.ids[slot]
+        arrival = self.arrival_times[slot]
+        if vehicle_id < 0:
+            vehicle_id = vehicle_label(vehicle_id)
+        return Vehicle(vehicle_id, None if arrival != arrival else arrival)
+
+    @property
+    def items(self):
+        """
+        Materialises the queued vehicles, front first. Only meant for status output,
+        it builds a Vehicle per car so it's O(n).
+        """
+        return [self._vehicle_at(self._slot(i)) for i in range(self._count)]
+
+    def head(self, k):
+        return [self._vehicle_at(self._slot(i)) for i in range(min(k, self._count))]
+
+    def tail(self, k):
+        k = min(k, self._count)
+        return [self._vehicle_at(self._slot(i)) for i in range(self._count - k, self._count)]
+
+    def enqueue(self, item):
+        vehicle_id = compact_vehicle_id(item.vehicle_id)
+        arrival = NO_TIME if item.arrival_time is None else item.arrival_time
+
+        if self.capacity is None:
+            self.ids.append(vehicle_id)
+            self.arrival_times.append(arrival)
+        else:
+            if self._count == self.capacity:
+                raise OverflowError(f"queue is full (capacity={self.capacity})")
+            slot = self._slot(self._count)
+            self.ids[slot] = vehicle_id
+            self.arrival_times[slot] = arrival
+        if vehicle_id < 0:
+            self.labelled += 1
+        self._count += 1
+
+    def extend(self, items):
+        for item in items:
+            self.enqueue(item)
+
+    def columns(self):
+        """
+        Copies of the (ids, arrival_times) columns, front first. Interned string IDs
+        show up as their codes; see labelled.
+        """
+        if self.capacity is None:
+            end = self._head + self._count
+            return self.ids[self._head:end], self.arrival_times[self._head:end]
+        first = min(self._count, self.capacity - self._head)
+        rest = self._count - first
+        return (self.ids[self._head:self._head + first] + self.ids[:rest],
+                self.arrival_times[self._head:self._head + first] + self.arrival_times[:rest])
+
+    def extend_columns(self, ids, arrival_times):
+        """
+        Appends whole columns at once (arrays or sequences of equal length), e.g. when
+        restoring a checkpoint; no Vehicle objects are created. Takes integer IDs
+        only, not interned codes.
+        """
+        n = len(ids)
+        if self.capacity is None:
+            self.ids.extend(ids)
+            self.arrival_times.extend(arrival_times)
+        else:
+            if self._count + n > self.capacity:
+                raise OverflowError(f"queue is full (capacity={self.capacity})")
+            ids = array("q", ids)
+            arrival_times = array("d", arrival_times)
+            # At most two slice copies: up to the end of the columns, then wrapping round
+            start = self._slot(self._count)
+            first = min(n, self.capacity - start)
+            self.ids[start:start + first] = ids[:first]
+            self.arrival_times[start:start + first] = arrival_times[:first]
+            self.ids[:n - first] = ids[first:]
+            self.arrival_times[:n - first] = arrival_times[first:]
+        self._count += n
+
+    def dequeue(self):
+        if self._count == 0:
+            return None
+
+        vehicle = self._vehicle_at(self._head)
+        code = self.ids[self._head]
+        if code < 0:
+            release_vehicle_id(code)
+            self.labelled -= 1
+        self._count -= 1
+
+        if self.capacity is not None:
+            self._head = (self._head + 1) % self.capacity
+            return vehicle
+
+        self._head += 1
+        if self._count == 0:
+            # Empty again, just reset the columns
+            del self.ids[:]
+            del self.arrival_times[:]
+            self._head = 0
+        elif self._head >= self.COMPACT_AFTER and self._head > self._count:
+            # Trim the dead prefix; amortised O(1) since it only happens after lots of dequeues
+            del self.ids[:self._head]
+            del self.arrival_times[:self._head]
+            self._head = 0
+        return vehicle
+
+    def clear(self):
+        """
+        Empties the queue, giving back its interned labels
+        """
+        if self.labelled:
+            for i in range(self._count):
+                code = self.ids[self._slot(i)]
+                if code < 0:
+                    release_vehicle_id(code)
+        self.__init__(self.capacity)
+
+    def is_empty(self):
+        return self._count == 0
+
+    def is_full(self):
+        return self.capacity is not None and self._count == self.capacity
+
+    def size(self):
+        return self._count
+
+    def peek(self):
+        if self._count == 0:
+            return None
+        return self._vehicle_at(self._head)
@@ -3,6 +3,92 @@ This module keeps track of some very basic traffic stats.
 
 Kept intentionally simple.
 """
+import math
+
+
+class LatencyHistogram:
+    """
+    Constant-memory histogram for wait times (HDR-style log-linear buckets).
+
+    Every power of two is split into SUB_BUCKETS equal buckets, so any percentile
+    comes back within ~3% of the true value no matter how many samples went in.
+    Values below 2**MIN_EXP (about a millisecond) share the first bucket, and
+    values above 2**MAX_EXP seconds share the last one.
+    """
+
+    SUB_BUCKETS = 32
+    MIN_EXP = -10
+    MAX_EXP = 20
+
+    def __init__(self):
+        self.counts = [0] * ((self.MAX_EXP - self.MIN_EXP) * self.SUB_BUCKETS + 2)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, value):
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+        mantissa, exponent = math.frexp(value)  # value = mantissa * 2**exponent, 0.5 <= mantissa < 1
+        if value <= 0 or exponent <= self.MIN_EXP:
+            index = 0
+        elif exponent > self.MAX_EXP:
+            index = len(self.counts) - 1
+        else:
+            index = ((exponent - self.MIN_EXP - 1) * self.SUB_BUCKETS
+                     + int((mantissa - 0.5) * 2 * self.SUB_BUCKETS) + 1)
+        self.counts[index] += 1
+
+    def _bucket_value(self, index):
+        # Midpoint of a bucket, clamped to the values actually seen
+        if index == 0:
+            return self.min
+        if index == len(self.counts) - 1:
+            return self.max
+        exponent, sub = divmod(index - 1, self.SUB_BUCKETS)
+        low = math.ldexp(0.5 + sub / (2 * self.SUB_BUCKETS), exponent + self.MIN_EXP + 1)
+        width = math.ldexp(1 / (2 * self.SUB_BUCKETS), exponent + self.MIN_EXP + 1)
+        return min(max(low + width / 2, self.min), self.max)
+
+    def percentile(self, p):
+        """
+        Approximate p-th percentile (0-100), None if nothing was recorded
+        """
+        if self.count == 0:
+            return None
+        rank = max(math.ceil(p / 100 * self.count), 1)
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return self._bucket_value(index)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def copy(self):
+        clone = LatencyHistogram()
+        clone.counts = self.counts[:]
+        clone.count = self.count
+        clone.total = self.total
+        clone.min = self.min
+        clone.max = self.max
+        return clone
+
+    def merge(self, other):
+        for index, bucket_count in enumerate(other.counts):
+            self.counts[index] += bucket_count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
 
 
 class Metrics:
@@ -15,22 +101,46 @@ class Metrics:
         # Per-lane breakdown.
         self.vehicles_served_per_lane = {}
 
-        # Thought about tracking timestamps here, but that's probably beyond the scope
-        # for this assignment, so leaving it out for now.
-        # self.last_served_time = None
+        # Per-lane queueing delay (time from Lane.add_vehicle until served)
+        self.wait_histograms = {}
 
-    def record_vehicle_served(self, lane_id):
+    def record_vehicle_served(self, lane_id, wait_time=None):
         """
         Called whenever a vehicle passes through a lane.
+        wait_time is how long it queued, in seconds, if known.
         """
         self.total_vehicles_served += 1
 
         if lane_id not in self.vehicles_served_per_lane:
             self.vehicles_served_per_lane[lane_id] = 0
+            self.wait_histograms[lane_id] = LatencyHistogram()
 
         # Increment the per-lane count
         self.vehicles_served_per_lane[lane_id] += 1
 
+        if wait_time is not None:
+            self.wait_histograms[lane_id].record(wait_time)
+
+    def wait_percentiles(self, lane_id=None, percentiles=(50, 95, 99)):
+        """
+        Wait time percentiles for one lane, or for all lanes combined when lane_id is None.
+        """
+        if lane_id is None:
+            hist = LatencyHistogram()
+            for lane_hist in self.wait_histograms.values():
+                hist.merge(lane_hist)
+        else:
+            hist = self.wait_histograms.get(lane_id, LatencyHistogram())
+        return {p: hist.percentile(p) for p in percentiles}
+
+    def throughput_per_hour(self, elapsed_seconds):
+        """
+        Vehicles served per hour over a run that lasted elapsed_seconds
+        """
+        if elapsed_seconds <= 0:
+            return 0.0
+        return self.total_vehicles_served * 3600 / elapsed_seconds
+
     def estimate_green_time(self, vehicles_count):
         """
         Estimate how long the green light should last.
@@ -48,5 +158,10 @@ class Metrics:
         print(f"Total vehicles served: {self.total_vehicles_served}")
 
         for lane_id, count in self.vehicles_served_per_lane.items():
-            print(f"Lane {lane_id}: {count} vehicles served")
-
+            hist = self.wait_histograms[lane_id]
+            if hist.count:
+                p50, p95, p99 = (hist.percentile(p) for p in (50, 95, 99))
+                print(f"Lane {lane_id}: {count} vehicles served, "
+                      f"wait p50={p50:.1f}s p95={p95:.1f}s p99={p99:.1f}s")
+            else:
+                print(f"Lane {lane_id}: {count} vehicles served")
@@ -0,0 +1,273 @@
+"""
+Road network: many intersections joined by roads with travel times.
+
+Each node is an ordinary Intersection. A link says where vehicles served from
+one of its L2 lanes go next: after travel_time ticks they join an L2 lane of
+another intersection. Vehicles served from a lane without a link leave the
+network. Only boundary lanes (lanes no link feeds into) get arrivals from the
+traffic generator's arrival model.
+
+Per tick the network delivers vehicles whose travel time is up, adds boundary
+arrivals and steps every intersection that has something queued. Vehicles in
+transit sit in per-tick buckets, so handing one off is O(1).
+
+A network can also hold just part of a bigger one (see partition.py). Nodes
+added with add_remote() live in another process: vehicles handed off to them
+collect in outbox[partition] until the caller ships them over, and the other
+side hands them back in with deliver(). Every node draws its arrivals from its
+own random stream, so how the nodes are split up doesn't change the results.
+"""
+import random
+import time
+
+from controllers import CONTROLLERS, make_controller
+from event_log import EventLog
+from intersection import Intersection
+from metrics import Metrics
+from traffic_generator import vehicles_arriving
+from vehicle import Vehicle
+
+# Where a vehicle going straight through each approach ends up on a grid:
+# road -> (row step, column step). A is the north approach, so its traffic heads
+# south and arrives at the next node's north approach, and so on (see visualizer.py)
+GRID_DIRECTIONS = {
+    "A": (1, 0),
+    "B": (0, -1),
+    "C": (-1, 0),
+    "D": (0, 1),
+}
+
+
+class RoadNetwork:
+    def __init__(self, seed=None, arrival_interval=5, id_offset=0, id_stride=1, controller=None,
+                 **lane_options):
+        """
+        id_offset/id_stride space out vehicle IDs when several networks make up one
+        bigger network, so IDs stay unique across all of them.
+        controller: optional function () -> signal controller (see controllers.py),
+        called once per node. Nodes keep Intersection's default otherwise.
+        """
+        self.seed = seed
+        self.arrival_interval = arrival_interval
+        self.id_offset = id_offset
+        self.id_stride = id_stride
+        self.controller = controller
+        self.lane_options = lane_options
+
+        self.nodes = {}          # node_id -> Intersection
+        self.remote = {}         # node_id -> partition, for nodes stepped somewhere else
+        self.links = {}          # (node_id, road_id) -> (dest node_id, dest road_id, travel time)
+        self.boundary_lanes = []  # [(lane, rng of its node), ...]
+        self.tick = 0
+
+        self._rngs = {}          # node_id -> random.Random
+        self._targets = {}       # id(lane) -> (destination lane, travel time)
+        self._remote_targets = {}  # id(lane) -> (partition, dest node_id, dest road_id, travel time)
+        self._in_transit = {}    # tick -> [(lane, vehicle), ...]
+        self.outbox = {}         # partition -> [(dest node_id, dest road_id, vehicle_id, due tick), ...]
+        self.in_transit_count = 0
+        self.vehicles_entered = 0
+        self.vehicles_exited = 0
+        self._built = False
+
+    def virtual_time(self):
+        return self.tick
+
+    def add_intersection(self, node_id, **kwargs):
+        """
+        Adds a node. kwargs go to Intersection; each node gets its own Metrics and logging is off.
+        """
+        kwargs.setdefault("metrics", Metrics())
+        kwargs.setdefault("event_log", EventLog.disabled())
+        if self.controller is not None:
+            kwargs.setdefault("controller", self.controller())
+        node = Intersection(**kwargs, **self.lane_options)
+        for road in node.roads.values():
+            for lane in (road.L1, road.L2, road.L3):
+                lane.clock = self.virtual_time
+        node.departure_handler = self._hand_off
+        self.nodes[node_id] = node
+        # A string seed gives the same stream in every process (and in every partition)
+        self._rngs[node_id] = random.Random(None if self.seed is None else f"{self.seed}:{node_id}")
+        self._built = False
+        return node
+
+    def add_remote(self, node_id, partition):
+        """
+        Declares a node that another network (partition) steps
+        """
+        self.remote[node_id] = partition
+        self._built = False
+
+    def connect(self, node_id, road_id, dest_node_id, dest_road_id, travel_time):
+        """
+        Vehicles served from node_id's road_id L2 lane continue to dest_node_id's dest_road_id L2 lane.
+        Either end may be a remote node.
+        """
+        if travel_time < 1:
+            raise ValueError("travel_time must be at least one tick")
+        self.links[(node_id, road_id)] = (dest_node_id, dest_road_id, travel_time)
+        self._built = False
+
+    def build(self):
+        """
+        Works out hand-off targets and boundary lanes. Called automatically before stepping.
+        """
+        self._targets = {}
+        self._remote_targets = {}
+        fed = set()
+        for (node_id, road_id), (dest_id, dest_road, travel_time) in self.links.items():
+            if dest_id in self.nodes:
+                dest_lane = self.nodes[dest_id].roads[dest_road].L2
+                fed.add(id(dest_lane))
+            if node_id not in self.nodes:
+                continue
+            lane = self.nodes[node_id].roads[road_id].L2
+            if dest_id in self.nodes:
+                self._targets[id(lane)] = (dest_lane, travel_time)
+                # Max-pressure style controllers weigh queues against the lane they feed
+                downstream = getattr(self.nodes[node_id].controller, "downstream", None)
+                if downstream is not None:
+                    downstream[road_id] = dest_lane
+            else:
+                partition = self.remote[dest_id]
+                self._remote_targets[id(lane)] = (partition, dest_id, dest_road, travel_time)
+                self.outbox.setdefault(partition, [])
+
+        self.boundary_lanes = [
+            (road.L2, self._rngs[node_id])
+            for node_id, node in self.nodes.items()
+            for road in node.roads.values()
+            if id(road.L2) not in fed
+        ]
+        self._built = True
+
+    def _hand_off(self, lane, vehicle):
+        target = self._targets.get(id(lane))
+        if target is None:
+            remote = self._remote_targets.get(id(lane))
+            if remote is None:
+                self.vehicles_exited += 1
+                return
+            partition, dest_id, dest_road, travel_time = remote
+            self.outbox[partition].append((dest_id, dest_road, vehicle.vehicle_id, self.tick + travel_time))
+            return
+        dest_lane, travel_time = target
+        due = self.tick + travel_time
+        bucket = self._in_transit.get(due)
+        if bucket is None:
+            bucket = self._in_transit[due] = []
+        bucket.append((dest_lane, vehicle))
+        self.in_transit_count += 1
+
+    def deliver(self, node_id, road_id, vehicle, due):
+        """
+        Hands in a vehicle from another partition; it joins node_id's road_id L2 lane at tick due
+        """
+        if due < self.tick:
+            raise ValueError(f"vehicle due at tick {due} delivered at tick {self.tick}")
+        bucket = self._in_transit.get(due)
+        if bucket is None:
+            bucket = self._in_transit[due] = []
+        bucket.append((self.nodes[node_id].roads[road_id].L2, vehicle))
+        self.in_transit_count += 1
+
+    def take_outbox(self):
+        """
+        Returns {partition: [(dest node_id, dest road_id, vehicle_id, due tick), ...]} and empties the outbox
+        """
+        outbox = self.outbox
+        self.outbox = {partition: [] for partition in outbox}
+        return outbox
+
+    def step(self):
+        if not self._built:
+            self.build()
+
+        # Vehicles whose travel time is up join their next lane
+        arriving = self._in_transit.pop(self.tick, None)
+        if arriving:
+            for lane, vehicle in arriving:
+                lane.add_vehicle(vehicle)
+            self.in_transit_count -= len(arriving)
+
+        # New traffic only enters at the edge of the network
+        if self.tick % self.arrival_interval == 0:
+            for lane, rng in self.boundary_lanes:
+                for _ in range(vehicles_arriving(rng)):
+                    vehicle_id = self.vehicles_entered * self.id_stride + self.id_offset + 1
+                    self.vehicles_entered += 1
+                    lane.add_vehicle(Vehicle(vehicle_id))
+
+        for node in self.nodes.values():
+            if node.queued_vehicles():
+                node.step()
+
+        self.tick += 1
+
+    def run(self, ticks):
+        start = time.perf_counter()
+        for _ in range(ticks):
+            self.step()
+        wall = time.perf_counter() - start
+        return {
+            "ticks": ticks,
+            "wall_seconds": wall,
+            "ticks_per_second": ticks / wall if wall > 0 else float("inf"),
+            **self.summary(),
+        }
+
+    def summary(self):
+        return {
+            "intersections": len(self.nodes),
+            "vehicles_entered": self.vehicles_entered,
+            "vehicles_exited": self.vehicles_exited,
+            "in_transit": self.in_transit_count + sum(len(out) for out in self.outbox.values()),
+            "queued": sum(node.queued_vehicles() for node in self.nodes.values()),
+            "served": sum(node.metrics.total_vehicles_served for node in self.nodes.values()),
+        }
+
+    @classmethod
+    def grid(cls, rows, cols, travel_time=10, seed=None, partitions=None, partition=None,
+             controller=None, **lane_options):
+        """
+        rows x cols grid; node (r, c) has its north approach fed by (r - 1, c), and so on.
+
+        With partitions ({node_id: partition}) only the nodes of the given partition are
+        stepped here; the rest of the grid is added as remote nodes.
+        """
+        network = cls(seed=seed, controller=controller, **lane_options)
+        grid_nodes = [(r, c) for r in range(rows) for c in range(cols)]
+        for node_id in grid_nodes:
+            if partitions is None or partitions[node_id] == partition:
+                network.add_intersection(node_id)
+            else:
+                network.add_remote(node_id, partitions[node_id])
+
+        for (r, c) in grid_nodes:
+            for road_id, (dr, dc) in GRID_DIRECTIONS.items():
+                dest = (r + dr, c + dc)
+                if 0 <= dest[0] < rows and 0 <= dest[1] < cols:
+                    network.connect((r, c), road_id, dest, road_id, travel_time)
+        network.build()
+        return network
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Step a grid of intersections")
+    parser.add_argument("--rows", type=int, default=10)
+    parser.add_argument("--cols", type=int, default=10)
+    parser.add_argument("--ticks", type=int, default=3600)
+    parser.add_argument("--travel-time", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--controller", choices=CONTROLLERS, default=None,
+                        help="signal controller for every node (default: Intersection's priority rules)")
+    args = parser.parse_args()
+
+    factory = (lambda: make_controller(args.controller)) if args.controller else None
+    network = RoadNetwork.grid(args.rows, args.cols, args.travel_time, seed=args.seed, controller=factory)
+    report = network.run(args.ticks)
+    for key, value in report.items():
+        print(f"{key}: {value}")
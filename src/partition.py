@@ -0,0 +1,211 @@
+"""
+Runs a large RoadNetwork grid across several processes.
+
+The grid is cut into rectangular blocks, one per worker process. Each worker
+builds and steps only its own block (the rest of the grid is "remote" to it).
+Vehicles that leave a block pile up in the network's outbox and are swapped
+with the neighbouring blocks in one batched message per neighbour.
+
+Workers don't need to talk every tick. A vehicle handed to another block is
+due travel_time ticks later at the earliest, so the workers step travel_time
+ticks on their own, then swap outboxes, and everything they receive is still
+in time. Every node has its own random stream, so the result is the same as
+stepping the whole grid in one process (check it with --compare).
+"""
+import multiprocessing
+import time
+import traceback
+
+from network import RoadNetwork
+from vehicle import Vehicle
+
+
+def grid_blocks(rows, cols, workers):
+    """
+    Splits a rows x cols grid into workers blocks. Returns {node_id: partition}.
+    Picks the block layout that cuts the fewest links.
+    """
+    best = None
+    for block_rows in range(1, workers + 1):
+        if workers % block_rows:
+            continue
+        block_cols = workers // block_rows
+        if block_rows > rows or block_cols > cols:
+            continue
+        cut = (block_rows - 1) * cols + (block_cols - 1) * rows
+        if best is None or cut < best[0]:
+            best = (cut, block_rows, block_cols)
+    if best is None:
+        raise ValueError(f"can't split a {rows}x{cols} grid into {workers} blocks")
+
+    _, block_rows, block_cols = best
+    return {
+        (r, c): (r * block_rows // rows) * block_cols + c * block_cols // cols
+        for r in range(rows)
+        for c in range(cols)
+    }
+
+
+def neighbours(partitions, rows, cols):
+    """
+    {partition: set of partitions it swaps vehicles with} for a grid
+    """
+    result = {partition: set() for partition in partitions.values()}
+    for (r, c), partition in partitions.items():
+        for other in ((r + 1, c), (r, c + 1)):
+            other_partition = partitions.get(other)
+            if other_partition is not None and other_partition != partition:
+                result[partition].add(other_partition)
+                result[other_partition].add(partition)
+    return result
+
+
+def _exchange(network, partition, peers):
+    """
+    Swaps outboxes with every neighbouring partition. Returns the number of vehicles received.
+
+    Each pair swaps in the same order on both sides (lower partition sends
+    first), and pairs are handled in ascending order, so a full pipe can't
+    deadlock two workers that are both trying to send.
+    """
+    outbox = network.take_outbox()
+    received = 0
+    for other in sorted(peers):
+        conn = peers[other]
+        batch = outbox.get(other, [])
+        if partition < other:
+            conn.send(batch)
+            incoming = conn.recv()
+        else:
+            incoming = conn.recv()
+            conn.send(batch)
+        for node_id, road_id, vehicle_id, due in incoming:
+            network.deliver(node_id, road_id, Vehicle(vehicle_id), due)
+        received += len(incoming)
+    return received
+
+
+def _worker(partition, spec, peers, result_conn):
+    try:
+        rows, cols, ticks, travel_time, seed, partitions, lane_options = spec
+        network = RoadNetwork.grid(rows, cols, travel_time, seed=seed, partitions=partitions,
+                                   partition=partition, id_offset=partition,
+                                   id_stride=len(set(partitions.values())), **lane_options)
+        exchanges = 0
+        received = 0
+
+        start = time.perf_counter()
+        while network.tick < ticks:
+            for _ in range(min(travel_time, ticks - network.tick)):
+                network.step()
+            received += _exchange(network, partition, peers)
+            exchanges += 1
+        wall = time.perf_counter() - start
+
+        result_conn.send(("ok", {
+            "wall_seconds": wall,
+            "exchanges": exchanges,
+            "vehicles_received": received,
+            **network.summary(),
+        }))
+    except Exception:
+        result_conn.send(("error", traceback.format_exc()))
+    finally:
+        for conn in peers.values():
+            conn.close()
+        result_conn.close()
+
+
+def run_partitioned(rows, cols, ticks, workers, travel_time=10, seed=None, **lane_options):
+    """
+    Steps a rows x cols grid for ticks ticks on workers processes and returns a
+    report shaped like RoadNetwork.run()'s.
+    """
+    if travel_time < 1:
+        raise ValueError("travel_time must be at least one tick")
+    partitions = grid_blocks(rows, cols, workers)
+    spec = (rows, cols, ticks, travel_time, seed, partitions, lane_options)
+
+    # spawn rather than fork: each worker must only hold its own pipe ends, so a
+    # worker that dies shows up as EOFError in its neighbours instead of a hang
+    context = multiprocessing.get_context("spawn")
+    peers = {partition: {} for partition in range(workers)}
+    for partition, others in neighbours(partitions, rows, cols).items():
+        for other in others:
+            if partition < other:
+                peers[partition][other], peers[other][partition] = context.Pipe()
+
+    start = time.perf_counter()
+    processes = []
+    results = []
+    for partition in range(workers):
+        result_recv, result_send = context.Pipe(duplex=False)
+        process = context.Process(target=_worker, name=f"partition-{partition}",
+                                  args=(partition, spec, peers[partition], result_send))
+        process.start()
+        result_send.close()
+        processes.append(process)
+        results.append(result_recv)
+    for conns in peers.values():
+        for conn in conns.values():
+            conn.close()
+
+    reports = []
+    errors = []
+    for partition, conn in enumerate(results):
+        try:
+            status, payload = conn.recv()
+        except EOFError:
+            status, payload = "error", "worker exited without a result"
+        if status == "ok":
+            reports.append(payload)
+        else:
+            errors.append(f"partition {partition}: {payload}")
+    for process in processes:
+        process.join()
+    wall = time.perf_counter() - start
+
+    if errors:
+        raise RuntimeError("partitioned run failed:\n" + "\n".join(errors))
+
+    # Workers run in lock-step, so the slowest one sets the pace
+    step_wall = max(report["wall_seconds"] for report in reports)
+    report = {
+        "ticks": ticks,
+        "workers": workers,
+        "wall_seconds": wall,
+        "step_wall_seconds": step_wall,
+        "ticks_per_second": ticks / step_wall if step_wall > 0 else float("inf"),
+    }
+    for key in ("intersections", "vehicles_entered", "vehicles_exited", "in_transit",
+                "queued", "served", "exchanges", "vehicles_received"):
+        report[key] = sum(r[key] for r in reports)
+    report["exchanges"] //= workers
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Step a grid of intersections on several processes")
+    parser.add_argument("--rows", type=int, default=20)
+    parser.add_argument("--cols", type=int, default=20)
+    parser.add_argument("--ticks", type=int, default=3600)
+    parser.add_argument("--travel-time", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--compare", action="store_true",
+                        help="also run the grid in one process and check the totals match")
+    args = parser.parse_args()
+
+    report = run_partitioned(args.rows, args.cols, args.ticks, args.workers,
+                             args.travel_time, seed=args.seed)
+    for key, value in report.items():
+        print(f"{key}: {value}")
+
+    if args.compare:
+        single = RoadNetwork.grid(args.rows, args.cols, args.travel_time, seed=args.seed).run(args.ticks)
+        keys = ("vehicles_entered", "vehicles_exited", "in_transit", "queued", "served")
+        mismatched = [key for key in keys if single[key] != report[key]]
+        print(f"single process: {single['ticks_per_second']:.1f} ticks/s")
+        print("compare: OK" if not mismatched else f"compare: MISMATCH in {', '.join(mismatched)}")
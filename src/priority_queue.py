@@ -1,29 +1,184 @@
+"""
+Lane scheduling.
 
-class LanePriorityQueue:
-    """
-    Simplified priority queue.
-    Only L2 road of lane A is ever treated as priority. Other lanes are never promoted to priority unlike in previous iterations. This keeps the traffic logic aligned with the scope of the assignment.
-    """
+LaneScheduler is an indexed binary max-heap of lanes: the lane with the highest
+priority key is always at the top, and a lane that changes size is moved to its
+new place in O(log n) instead of rescanning every lane. Lanes tell the
+scheduler about size changes through Lane.listeners.
+
+LanePriorityQueue is the original behaviour (only AL2 is ever treated as
+priority), now just a scheduler configured to hold that single lane.
+"""
+
+
+def length_key(lane):
+    return lane.size()
+
+
+def age_key(lane):
+    # How long the front vehicle has waited, so weights scale the wait the way
+    # they scale a length. Grows with time, see LaneScheduler.refresh.
+    vehicle = lane.next_vehicle()
+    if vehicle is None or vehicle.arrival_time is None:
+        return float("-inf")
+    return lane.clock() - vehicle.arrival_time
 
-    def __init__(self, priority_lane_id = "AL2"):
-        self.priority_lane_id = priority_lane_id
-        self.priority_lane = None
+
+KEYS = {
+    "length": length_key,
+    "age": age_key,
+}
+
+
+class LaneScheduler:
+    def __init__(self, key="length", weights=None, lane_filter=None, refresh=None):
+        """
+        key:         "length" (queue length), "age" (longest wait of a front vehicle),
+                     or any function lane -> number, higher is served first
+        weights:     optional {lane_id: weight}, multiplies the key (lanes not listed get 1)
+        lane_filter: optional function lane -> bool deciding which lanes register_lane accepts
+        refresh:     re-key every lane on each peek, for keys that change while the
+                     lanes don't (on by default for "age")
+        """
+        self.key_fn = KEYS[key] if isinstance(key, str) else key
+        self.refresh_on_peek = self.key_fn is age_key if refresh is None else refresh
+        self.weights = weights or {}
+        self.lane_filter = lane_filter
+
+        self._heap = []    # lanes, heap ordered
+        self._pos = {}     # lane_id -> index in _heap
+        self._keys = {}    # lane_id -> (key, -registration order)
+        self._order = 0
+
+    def _key(self, lane):
+        key = self.key_fn(lane)
+        weight = self.weights.get(lane.lane_id)
+        # An empty lane stays at the bottom whatever its weight (-inf * 0 would be NaN)
+        if weight is None or key == float("-inf"):
+            return key
+        return key * weight
+
+    def _higher(self, i, j):
+        return self._keys[self._heap[i].lane_id] > self._keys[self._heap[j].lane_id]
+
+    def _swap(self, i, j):
+        heap = self._heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self._pos[heap[i].lane_id] = i
+        self._pos[heap[j].lane_id] = j
+
+    def _sift_up(self, i):
+        while i > 0:
+            parent = (i - 1) // 2
+            if not self._higher(i, parent):
+                break
+            self._swap(i, parent)
+            i = parent
+        return i
+
+    def _sift_down(self, i):
+        n = len(self._heap)
+        while True:
+            best = i
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < n and self._higher(child, best):
+                    best = child
+            if best == i:
+                return i
+            self._swap(i, best)
+            i = best
 
     def register_lane(self, lane):
-        if lane.lane_id == self.priority_lane_id:
-            self.priority_lane = lane
+        if self.lane_filter is not None and not self.lane_filter(lane):
+            return
+        if lane.lane_id in self._pos:
+            return
+
+        self._order += 1
+        self._keys[lane.lane_id] = (self._key(lane), -self._order)
+        self._heap.append(lane)
+        self._pos[lane.lane_id] = len(self._heap) - 1
+        self._sift_up(len(self._heap) - 1)
+        lane.listeners.append(self.update)
+
+    def unregister_lane(self, lane):
+        i = self._pos.pop(lane.lane_id, None)
+        if i is None:
+            return
+        last = self._heap.pop()
+        if i < len(self._heap):
+            self._heap[i] = last
+            self._pos[last.lane_id] = i
+            self._sift_down(self._sift_up(i))
+        del self._keys[lane.lane_id]
+        lane.listeners.remove(self.update)
+
+    def update(self, lane):
+        """
+        Re-keys one lane after it changed (O(log n)). Lanes call this themselves.
+        """
+        i = self._pos.get(lane.lane_id)
+        if i is None:
+            return
+        order = self._keys[lane.lane_id][1]
+        self._keys[lane.lane_id] = (self._key(lane), order)
+        self._sift_down(self._sift_up(i))
+
+    def refresh(self):
+        """
+        Re-keys every lane and rebuilds the heap (O(n)), for when the keys moved
+        without the lanes changing, e.g. waits growing as time passes
+        """
+        for lane in self._heap:
+            order = self._keys[lane.lane_id][1]
+            self._keys[lane.lane_id] = (self._key(lane), order)
+        for i in reversed(range(len(self._heap) // 2)):
+            self._sift_down(i)
+
+    def lanes(self):
+        return list(self._heap)
 
     def peek(self):
-        if self.priority_lane and self.priority_lane.size()>0:
-            return self.priority_lane
+        """
+        Highest priority lane, or None if it has no vehicles
+        """
+        if self.refresh_on_peek:
+            self.refresh()
+        if self._heap and self._heap[0].size() > 0:
+            return self._heap[0]
         return None
-    
+
     def dequeue(self):
+        # Lanes stay scheduled while they're served; serving them updates their key
         return self.peek()
 
     def is_empty(self):
         return self.peek() is None
-    
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __str__(self):
+        top = self.peek()
+        if top:
+            return f"[PRIORITY: {top.lane_id}]"
+        return "[NO PRIORITY LANE]"
+
+
+class LanePriorityQueue(LaneScheduler):
+    """
+    Simplified priority queue.
+    Only L2 road of lane A is ever treated as priority. Other lanes are never promoted to priority unlike in previous iterations. This keeps the traffic logic aligned with the scope of the assignment.
+    """
+
+    def __init__(self, priority_lane_id = "AL2"):
+        super().__init__(key="length", lane_filter=lambda lane: lane.lane_id == priority_lane_id)
+        self.priority_lane_id = priority_lane_id
+
+    @property
+    def priority_lane(self):
+        return self._heap[0] if self._heap else None
+
     def __str__(self):
         if self.priority_lane:
             return f"[PRIORITY: {self.priority_lane.lane_id}]"
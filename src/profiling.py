@@ -0,0 +1,154 @@
+"""
+Per-phase timing and on-demand cProfile captures for the run loops.
+
+Profiler times named phases of a loop (ingest, step, render, ...):
+
+    profiler = Profiler(enabled=True)
+    with profiler.phase("step"):
+        intersection.step()
+    profiler.print_report()
+
+Each phase keeps its last `window` durations, so min/mean/max/p99 describe
+recent behaviour rather than the whole run. A disabled profiler hands out one
+shared do-nothing context manager, so leaving the `with` blocks in costs an
+attribute lookup and two empty calls per phase.
+
+CaptureToggle turns a cProfile capture on and off, from code or from a signal
+(SIGUSR1 by default: `kill -USR1 <pid>`). Every stop writes the capture to a
+file that `python -m pstats` or snakeviz can open.
+"""
+import cProfile
+import math
+import os
+import signal
+import time
+from collections import deque
+
+
+class PhaseTimer:
+    __slots__ = ("window", "count", "_start")
+
+    def __init__(self, window=1000):
+        self.window = deque(maxlen=window)  # recent durations, in ms
+        self.count = 0
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.window.append((time.perf_counter() - self._start) * 1000)
+        self.count += 1
+        return False
+
+    def stats(self):
+        """
+        (min, mean, max, p99) over the window in ms, or None if nothing was timed
+        """
+        if not self.window:
+            return None
+        ordered = sorted(self.window)
+        p99 = ordered[max(math.ceil(0.99 * len(ordered)), 1) - 1]
+        return ordered[0], sum(ordered) / len(ordered), ordered[-1], p99
+
+
+class _NoPhase:
+    """
+    What a disabled profiler hands out: a context manager that does nothing
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NO_PHASE = _NoPhase()
+
+
+class Profiler:
+    def __init__(self, enabled=False, window=1000):
+        self.enabled = enabled
+        self.window = window
+        self.phases = {}  # name -> PhaseTimer, in the order they first ran
+
+    def phase(self, name):
+        """
+        Context manager timing one run of the phase `name`
+        """
+        if not self.enabled:
+            return NO_PHASE
+        timer = self.phases.get(name)
+        if timer is None:
+            timer = self.phases[name] = PhaseTimer(self.window)
+        return timer
+
+    def report(self):
+        """
+        {phase: {"count", "min", "mean", "max", "p99"}} with times in ms
+        """
+        report = {}
+        for name, timer in self.phases.items():
+            stats = timer.stats()
+            if stats is not None:
+                report[name] = dict(zip(("min", "mean", "max", "p99"), stats), count=timer.count)
+        return report
+
+    def print_report(self, prefix=""):
+        for name, s in self.report().items():
+            print(f"{prefix}{name:>14}: min={s['min']:.3f}ms mean={s['mean']:.3f}ms "
+                  f"max={s['max']:.3f}ms p99={s['p99']:.3f}ms (n={s['count']})")
+
+
+class CaptureToggle:
+    def __init__(self, path="profile.prof"):
+        """
+        path: where captures go; the second one is written to profile-2.prof and so on
+        """
+        self.path = path
+        self.profile = None
+        self.captures = 0
+
+    @property
+    def active(self):
+        return self.profile is not None
+
+    def start(self):
+        if self.profile is None:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+    def stop(self):
+        """
+        Ends the capture and writes it out. Returns the file, or None if nothing was running.
+        """
+        if self.profile is None:
+            return None
+        self.profile.disable()
+        self.captures += 1
+        root, ext = os.path.splitext(self.path)
+        path = self.path if self.captures == 1 else f"{root}-{self.captures}{ext}"
+        self.profile.dump_stats(path)
+        self.profile = None
+        return path
+
+    def toggle(self):
+        if self.active:
+            path = self.stop()
+            print(f"[PROFILE] cProfile capture written to {path}")
+        else:
+            self.start()
+            print("[PROFILE] cProfile capture started")
+
+    def install_signal(self, signum=getattr(signal, "SIGUSR1", None)):
+        """
+        Toggles the capture whenever the process gets signum. Returns False where
+        there's no such signal (Windows). Call from the main thread.
+        """
+        if signum is None:
+            return False
+        signal.signal(signum, lambda *_: self.toggle())
+        return True
@@ -1,22 +1,112 @@
+from collections import deque
+
+
 class Queue:
-    def __init__(self):
-        self.items = []
+    """
+    FIFO queue used by every lane.
+
+    By default it's backed by a deque so both ends are O(1). Passing a capacity
+    switches it to a fixed-size ring buffer that preallocates its slots up front.
+    """
+
+    def __init__(self, capacity=None):
+        self.capacity = capacity
+
+        if capacity is None:
+            self._items = deque()
+        else:
+            if capacity <= 0:
+                raise ValueError("capacity must be a positive integer")
+            # Ring buffer state: slots are allocated once and reused
+            self._slots = [None] * capacity
+            self._head = 0
+            self._count = 0
+
+    @property
+    def items(self):
+        """
+        Vehicles currently queued, front first. Read-only view for callers like
+        print_status; use enqueue/dequeue to change the queue.
+        """
+        if self.capacity is None:
+            return self._items
+        first = min(self._count, self.capacity - self._head)
+        return self._slots[self._head:self._head + first] + self._slots[:self._count - first]
+
+    def head(self, k):
+        """
+        First k queued items, without walking the rest of the queue
+        """
+        k = min(k, self.size())
+        if self.capacity is None:
+            return [self._items[i] for i in range(k)]
+        return [self._slots[(self._head + i) % self.capacity] for i in range(k)]
+
+    def tail(self, k):
+        """
+        Last k queued items (oldest first), without walking the rest of the queue
+        """
+        n = self.size()
+        k = min(k, n)
+        if self.capacity is None:
+            return [self._items[i] for i in range(n - k, n)]
+        return [self._slots[(self._head + i) % self.capacity] for i in range(n - k, n)]
 
     def enqueue(self, item):
-        self.items.append(item)
+        if self.capacity is None:
+            self._items.append(item)
+            return
+
+        if self._count == self.capacity:
+            raise OverflowError(f"queue is full (capacity={self.capacity})")
+        self._slots[(self._head + self._count) % self.capacity] = item
+        self._count += 1
+
+    def extend(self, items):
+        """
+        Enqueues items in order (a single C-level extend for deque queues)
+        """
+        if self.capacity is None:
+            self._items.extend(items)
+            return
+
+        items = list(items)
+        if self._count + len(items) > self.capacity:
+            raise OverflowError(f"queue is full (capacity={self.capacity})")
+        # At most two slice copies: up to the end of the slots, then wrapping round to the start
+        start = (self._head + self._count) % self.capacity
+        first = min(len(items), self.capacity - start)
+        self._slots[start:start + first] = items[:first]
+        self._slots[:len(items) - first] = items[first:]
+        self._count += len(items)
 
     def dequeue(self):
-        if not self.is_empty():
-            return self.items.pop(0)
-        return None
+        if self.is_empty():
+            return None
+
+        if self.capacity is None:
+            return self._items.popleft()
+
+        item = self._slots[self._head]
+        self._slots[self._head] = None  # drop reference so it can be collected
+        self._head = (self._head + 1) % self.capacity
+        self._count -= 1
+        return item
 
     def is_empty(self):
-        return len(self.items) == 0
+        return self.size() == 0
+
+    def is_full(self):
+        return self.capacity is not None and self._count == self.capacity
 
     def size(self):
-        return len(self.items)
+        if self.capacity is None:
+            return len(self._items)
+        return self._count
 
     def peek(self):
-        if not self.is_empty():
-            return self.items[0]
-        return None
+        if self.is_empty():
+            return None
+        if self.capacity is None:
+            return self._items[0]
+        return self._slots[self._head]
@@ -5,15 +5,16 @@ from traffic_light import TrafficLight
 
 
 class Road:
-    def __init__(self, road_id):
+    def __init__(self, road_id, **lane_options):
         self.road_id = road_id
 
-        self.L1 = Lane(f"{road_id}L1")  # incoming lane
+        # lane_options (e.g. capacity, compact, clock) are passed straight through to every Lane
+        self.L1 = Lane(f"{road_id}L1", **lane_options)  # incoming lane
 
-        self.L2 = Lane(f"{road_id}L2")  # priority lane
+        self.L2 = Lane(f"{road_id}L2", **lane_options)  # priority lane
         self.L2.light = TrafficLight()
 
-        self.L3 = Lane(f"{road_id}L3")  # free lane
+        self.L3 = Lane(f"{road_id}L3", **lane_options)  # free lane
 
     def is_priority_lane(self):
         """Checking if L2 should be treated as priority lane"""
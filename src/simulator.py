@@ -1,56 +1,52 @@
+import argparse
 import random
+import sys
 import time
 import os
 
+import event_log
+from checkpoint import Checkpointer, restore
+from event_engine import EventEngine
+from exporter import MetricsExporter
 from intersection import Intersection
 from vehicle import Vehicle
 from metrics import Metrics
+from profiling import CaptureToggle, Profiler
+from status_view import StatusView, lane_preview
+from transport import DATA_DIR, TRANSPORTS, FileLaneReader, open_reader
 
-DATA_DIR = "lane_data"
-
-def load_vehicles_from_files(intersection):
+def load_vehicles_from_files(intersection, reader=None):
     """
-    Pull vehicle IDs from lane files and push them into the queues. Once read, wipe the files so we don't process the same cars again
+    Pull new vehicle IDs from the arrival transport and push them into the queues.
+    By default that's the lane files, which get wiped once read so we don't process the same cars again
     """
+    if reader is None:
+        reader = FileLaneReader(DATA_DIR)
+
     added_any = False
     for road in intersection.roads.values():
         lane = road.L2
-        file_path = os.path.join(DATA_DIR,f"{lane.lane_id}.txt")
-
-        if not os.path.exists(file_path):
-            continue
-
-        with open(file_path, "r") as f:
-            lines = f.readlines()
-        
-        if not lines:
-            continue
-
-        for line in lines:
-            vehicle_id = line.strip()
-            if vehicle_id:
-                lane.add_vehicle(Vehicle(vehicle_id))
-        
-        #Clear file after reading data
-        open(file_path, "w").close()
+        vehicle_ids = reader.read_new(lane.lane_id)
+
+        for vehicle_id in vehicle_ids:
+            lane.add_vehicle(Vehicle(vehicle_id))
+            added_any = True
     
     # Just a safeguard feature to know when the generator stopped adding vehicles
     if not added_any:
-        print("[LOG] No new vehicles added this step")
+        intersection.events.emit("no_arrivals", "No new vehicles added this step")
     
     return added_any
 
 def print_status(intersection, step_count):
     """
-    Prints L2 lane sizes, vehicles queue, and traffic light states
+    Prints L2 lane sizes, vehicles queue, and traffic light states.
+    Long queues are cut down to their first and last few vehicle IDs.
     """
     print(f"\n\t\t\tSimulation Step {step_count}\t\t\t\n")
     for road_id, road in intersection.roads.items():
         lane = road.L2
-        vehicles_container = []
-        for v in lane.queue.items:
-            vehicles_container.append(v.vehicle_id)
-        vehicles_str = ", ".join(vehicles_container)
+        vehicles_str = lane_preview(lane, shown=5)
         print(
             f"{lane.lane_id}: size= {lane.size()}, light={lane.light}, vehicles= [{vehicles_str}]"
         )
@@ -62,39 +58,178 @@ def print_status(intersection, step_count):
     print("=" * 60)  # divider only
 
 
-def run_simulation():
+def run_simulation(compact=False, transport="file", export_jsonl=None, metrics_port=None, events=None,
+                   status="plain", profiler=None, checkpoint_path=None, checkpoint_every=10,
+                   status_notice=None):
+    # Per-phase timings (see profiling.py); a disabled profiler costs next to nothing
+    if profiler is None:
+        profiler = Profiler()
+
     #Create metrics object
     metrics = Metrics(time_per_vehicle=1)
 
-    #Pass metrics to Intersection class
-    intersection = Intersection(metrics = metrics)
+    #Pass metrics to Intersection class (compact lanes store IDs in typed arrays)
+    intersection = Intersection(metrics = metrics, event_log = events, compact = compact)
+    reader = open_reader(transport, consumer="simulator")
+
+    # Pick up queues, lights, metrics and the reader's position from the last run
     step_count = 0
+    checkpointer = None
+    if checkpoint_path:
+        if os.path.exists(checkpoint_path):
+            step_count = restore(checkpoint_path, intersection, metrics, reader)["step"]
+            print(f"Restored {intersection.queued_vehicles()} queued vehicles from {checkpoint_path} "
+                  f"(step {step_count})")
+        checkpointer = Checkpointer(intersection, checkpoint_path, metrics, reader)
+    # A reader without a position (the file transport empties the lane files as it
+    # reads them) can't hand arrivals out again, so those are checkpointed right away
+    checkpoint_on_ingest = checkpointer is not None and not reader.state()
+
+    # Optional snapshot export (JSONL file and/or Prometheus endpoint), runs on background threads
+    exporter = None
+    if export_jsonl or metrics_port is not None:
+        exporter = MetricsExporter(intersection, metrics, jsonl_path=export_jsonl, port=metrics_port).start()
+
+    # "live" redraws a fixed-size view in place, "plain" prints a status block per step
+    view = StatusView(notice=status_notice) if status == "live" else None
+
     print("Starting simulation for L2 lanes. Press Ctrl + C to stop.")
     try:
         while True:
             step_count += 1
 
             # Load vehicles data stored in files
-            load_vehicles_from_files(intersection)
+            with profiler.phase("ingest"):
+                ingested = load_vehicles_from_files(intersection, reader)
 
             # execute intersection step (priority first, else normal)
-            intersection.step()
+            with profiler.phase("step"):
+                intersection.step()
 
             # print current lane status
-            print_status(intersection, step_count)
-
-            #Print metrics summary every 5 steps
-            if step_count%5==0:
-                metrics.print_summary()
+            with profiler.phase("print_status"):
+                if view:
+                    view.update(intersection, step_count)
+                else:
+                    print_status(intersection, step_count)
+
+            if exporter:
+                with profiler.phase("export"):
+                    exporter.publish(step_count)
+
+            #Print metrics summary every 5 steps (the live view shows totals itself)
+            if not view and step_count%5==0:
+                with profiler.phase("print_summary"):
+                    metrics.print_summary()
+                if profiler.enabled:
+                    profiler.print_report("[PROFILE] ")
+
+            # Written on a background thread; only the lanes that changed are re-encoded
+            if checkpointer and (step_count % checkpoint_every == 0 or (ingested and checkpoint_on_ingest)):
+                with profiler.phase("checkpoint"):
+                    try:
+                        checkpointer.checkpoint(step_count)
+                    except (OSError, ValueError) as e:
+                        # A failed (earlier) write shouldn't stop the simulation; the next one retries
+                        print(f"Checkpoint failed: {e}")
 
             # wait for next simulation
             time.sleep(1)
 
     except KeyboardInterrupt:
+        if view:
+            view.close()
         print("\nSimulation stopped.")
         # print final metrics summary after simulation stops
         metrics.print_summary()
+        if profiler.enabled:
+            profiler.print_report("[PROFILE] ")
+    finally:
+        if checkpointer:
+            try:
+                checkpointer.checkpoint(step_count)
+                checkpointer.close()
+            except (OSError, ValueError) as e:
+                print(f"Checkpoint failed: {e}")
+        reader.close()
+        intersection.events.close()
+        if exporter:
+            exporter.publish(step_count, force=True)
+            exporter.stop()
+
+
+def run_headless(duration, seed=None, compact=False):
+    """
+    Fast-forward the simulation with the discrete-event engine instead of sleeping
+    between steps. duration is in simulated seconds.
+    """
+    metrics = Metrics(time_per_vehicle=1)
+    intersection = Intersection(metrics = metrics, compact = compact)
+    engine = EventEngine(intersection, metrics, seed=seed)
+
+    report = engine.run(duration)
+
+    print(f"Simulated {report['simulated_seconds']}s in {report['wall_seconds']:.3f}s wall time "
+          f"({report['sim_seconds_per_wall_second']:.0f} simulated s / wall s)")
+    print(f"Events processed: {report['events']}, vehicles arrived: {report['vehicles_arrived']}, "
+          f"departed: {report['vehicles_departed']}")
+    print_status(intersection, engine.events_processed)
+    metrics.print_summary()
+    return report
 
 
 if __name__ == "__main__":
-    run_simulation()
+    parser = argparse.ArgumentParser(description="Traffic intersection simulator")
+    parser.add_argument("--compact", action="store_true", help="store lane queues in typed arrays")
+    parser.add_argument("--transport", choices=TRANSPORTS, default="file", help="where arrivals are read from")
+    parser.add_argument("--export-jsonl", metavar="PATH", help="append metrics snapshots to this JSONL file")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on localhost:PORT/metrics")
+    parser.add_argument("--log-level", choices=event_log.LEVEL_NAMES, default="info", help="event log level ('off' disables it)")
+    parser.add_argument("--log-sample", action="append", metavar="EVENT=RATE", help="keep only this fraction of an event kind, e.g. vehicle_removed=0.01")
+    parser.add_argument("--log-file", metavar="PATH", help="write events to a file from a background thread")
+    parser.add_argument("--log-async", action="store_true",
+                        help="write events to stdout from a background thread too, so the loop doesn't wait on the terminal")
+    parser.add_argument("--status", choices=("live", "plain"), help="status output (default: live on a terminal, plain otherwise)")
+    parser.add_argument("--headless", action="store_true", help="run the discrete-event engine as fast as possible")
+    parser.add_argument("--duration", type=float, default=86400, help="simulated seconds for --headless")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for --headless arrivals")
+    parser.add_argument("--profile", action="store_true",
+                        help="time each phase of the loop (ingest, step, print_status, print_summary)")
+    parser.add_argument("--checkpoint", metavar="PATH",
+                        help="restore from PATH if it exists, then checkpoint the simulation state to it "
+                             "(with --transport file, after every step that read arrivals: the lane "
+                             "files are emptied as they're read, so a crash before that checkpoint "
+                             "loses that step's arrivals)")
+    parser.add_argument("--checkpoint-every", type=int, default=10, metavar="STEPS",
+                        help="steps between checkpoints (one is always written on exit)")
+    parser.add_argument("--cprofile", metavar="PATH",
+                        help="capture a cProfile of the whole run to PATH (SIGUSR1 also starts/stops a capture)")
+    args = parser.parse_args()
+
+    # kill -USR1 <pid> starts a cProfile capture and the next one writes it out
+    capture = CaptureToggle(args.cprofile or "simulator.prof")
+    capture.install_signal()
+    if args.cprofile:
+        capture.start()
+
+    if args.headless:
+        run_headless(args.duration, seed=args.seed, compact=args.compact)
+    else:
+        status = args.status or ("live" if sys.stdout.isatty() else "plain")
+        notice = None
+        if status == "live" and not args.log_file:
+            # Log lines on stdout would scroll the live view away
+            events = event_log.EventLog.disabled()
+            if args.log_level != "off":
+                # The live view clears the screen, so it shows this itself
+                notice = "Event log off in the live view: --log-file PATH keeps it, or use --status plain"
+        else:
+            events = event_log.from_args(args.log_level, args.log_file, args.log_sample, async_stdout=args.log_async)
+        run_simulation(compact=args.compact, transport=args.transport,
+                       export_jsonl=args.export_jsonl, metrics_port=args.metrics_port, events=events,
+                       status=status, profiler=Profiler(enabled=args.profile),
+                       checkpoint_path=args.checkpoint, checkpoint_every=args.checkpoint_every,
+                       status_notice=notice)
+
+    if capture.active:
+        print(f"cProfile capture written to {capture.stop()}")
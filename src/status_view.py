@@ -0,0 +1,105 @@
+"""
+Live terminal status view for the simulator.
+
+print_status dumps every queued vehicle ID on every step, so its cost (and the
+amount of text) grows with the queues. StatusView draws a fixed-size frame
+instead: queue length, the first and last few IDs of each lane, the lights and
+the priority state. Like curses, it remembers the last frame and only rewrites
+the part of each row that changed, using plain ANSI escape codes. Redraws are
+capped at max_fps however fast the simulation steps.
+"""
+import sys
+import time
+
+ESC = "\x1b["
+
+
+def lane_preview(lane, shown=3):
+    """
+    "first, ..., last" IDs of a lane, reading at most 2 * shown vehicles
+    """
+    size = lane.size()
+    if size <= 2 * shown:
+        ids = [str(v.vehicle_id) for v in lane.queue.head(size)]
+        return ", ".join(ids)
+    first = ", ".join(str(v.vehicle_id) for v in lane.queue.head(shown))
+    last = ", ".join(str(v.vehicle_id) for v in lane.queue.tail(shown))
+    return f"{first}, ... {size - 2 * shown} more ..., {last}"
+
+
+class StatusView:
+    def __init__(self, stream=None, max_fps=10, shown=3, notice=None):
+        """
+        notice: a line shown under every frame, e.g. that the event log is off
+        """
+        self.stream = stream if stream is not None else sys.stdout
+        self.notice = notice
+        self.min_interval = 1 / max_fps
+        self.shown = shown
+        self.previous = None  # rows of the last frame drawn
+        self.last_draw = 0.0
+
+    def build_frame(self, intersection, step_count):
+        rows = [f"Simulation Step {step_count}", ""]
+        for lane in (road.L2 for road in intersection.roads.values()):
+            rows.append(f"{lane.lane_id}: size={lane.size():>7}  light={str(lane.light):<5}  "
+                        f"[{lane_preview(lane, self.shown)}]")
+
+        active_priority = intersection.get_active_priority_lane()
+        rows.append("")
+        rows.append(f"Active priority lane: {active_priority.lane_id if active_priority else 'None'}")
+
+        metrics = intersection.metrics
+        if metrics is not None:
+            p95 = metrics.wait_percentiles(percentiles=(95,))[95]
+            wait = f"{p95:.1f}s" if p95 is not None else "-"
+            rows.append(f"Vehicles served: {metrics.total_vehicles_served}   wait p95: {wait}")
+        rows.append("=" * 60)
+        if self.notice:
+            rows.append(self.notice)
+        return rows
+
+    def update(self, intersection, step_count, force=False):
+        """
+        Redraws if enough time has passed since the last frame. Returns True if it drew.
+        """
+        now = time.monotonic()
+        if not force and now - self.last_draw < self.min_interval:
+            return False
+        self.last_draw = now
+        self.draw(self.build_frame(intersection, step_count))
+        return True
+
+    def draw(self, rows):
+        out = []
+        if self.previous is None:
+            # First frame: clear the screen and hide the cursor
+            out.append(f"{ESC}2J{ESC}?25l")
+            self.previous = []
+
+        for i, row in enumerate(rows):
+            old = self.previous[i] if i < len(self.previous) else None
+            if row == old:
+                continue
+            # Only rewrite from the first character that changed
+            start = 0
+            if old is not None:
+                limit = min(len(row), len(old))
+                while start < limit and row[start] == old[start]:
+                    start += 1
+            out.append(f"{ESC}{i + 1};{start + 1}H{row[start:]}{ESC}K")
+
+        # Blank out rows the new frame no longer has
+        for i in range(len(rows), len(self.previous)):
+            out.append(f"{ESC}{i + 1};1H{ESC}K")
+
+        self.previous = rows
+        if out:
+            self.stream.write("".join(out))
+            self.stream.flush()
+
+    def close(self):
+        if self.previous is not None:
+            # Park the cursor under the frame and show it again
+            self.stream.write(f"{ESC}{len(self.previous) + 1};1H{ESC}?25h\n")
+            self.stream.flush()
@@ -0,0 +1,262 @@
+"""
+Parameter sweep for tuning the signal policy.
+
+Every combination of the parameter grid is run headless (event_engine.py) once
+per seed, in a process pool. Each finished run is appended to a CSV straight
+away, so the file doubles as the results table and as the resume point: running
+the same sweep again skips every (parameters, seed) row already in the file.
+
+    python sweep.py --grid priority_threshold=5,8,10 --grid time_per_vehicle=1,2 \\
+        --seeds 0-9 --out sweep.csv
+    python sweep.py --grid controller=priority,fixed-time,longest-queue,max-pressure --seeds 0-9
+"""
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+
+from controllers import CONTROLLERS, make_controller
+from event_engine import EventEngine
+from intersection import Intersection
+from metrics import LatencyHistogram, Metrics
+
+# Parameters a scenario understands, with the values the simulator uses today
+PARAMETERS = {
+    "controller": "priority",  # signal controller, a name from controllers.CONTROLLERS
+    "priority_threshold": 5,   # priority lane takes over above this many vehicles
+    "priority_drain_to": 5,    # ... and is served down to this many
+    "hysteresis_on": 10,       # hysteresis: priority road stays green once above this many
+    "hysteresis_off": 5,       # ... until it is down to this many
+    "signal_period": 5.0,      # fixed-time / hysteresis: seconds per round-robin phase
+    "min_green": 2.0,          # longest-queue / max-pressure: shortest green, in seconds
+    "time_per_vehicle": 1,     # Metrics: green time per served vehicle, in seconds
+}
+
+RESULT_COLUMNS = ["vehicles_arrived", "vehicles_served", "throughput_per_hour",
+                  "mean_wait", "p95_wait", "max_queue", "wall_seconds"]
+
+
+def check_params(params):
+    """
+    Raises ValueError for a combination no scenario can run. Returns params with
+    the defaults filled in.
+    """
+    unknown = set(params) - set(PARAMETERS)
+    if unknown:
+        raise ValueError(f"unknown parameters: {', '.join(sorted(unknown))}")
+    params = {**PARAMETERS, **params}
+    if params["controller"] not in CONTROLLERS:
+        raise ValueError(f"unknown controller: {params['controller']}")
+    # The priority knobs only mean something to the priority controller
+    if params["controller"] == "priority" and params["priority_drain_to"] > params["priority_threshold"]:
+        raise ValueError("priority_drain_to can't be above priority_threshold")
+    return params
+
+
+def run_scenario(params, seed, duration):
+    """
+    One headless run. Returns the result columns as a dict.
+    """
+    params = check_params(params)
+    # Other controllers ignore the priority knobs, so leave the intersection's own at their defaults
+    priority = params if params["controller"] == "priority" else PARAMETERS
+
+    metrics = Metrics(time_per_vehicle=params["time_per_vehicle"])
+    controller = make_controller(params["controller"],
+                                 threshold=params["priority_threshold"],
+                                 drain_to=params["priority_drain_to"],
+                                 period=params["signal_period"],
+                                 time_per_vehicle=params["time_per_vehicle"],
+                                 min_green=params["min_green"],
+                                 on=params["hysteresis_on"],
+                                 off=params["hysteresis_off"])
+    intersection = Intersection(metrics=metrics,
+                                priority_threshold=priority["priority_threshold"],
+                                priority_drain_to=priority["priority_drain_to"],
+                                controller=controller)
+
+    # Longest any single lane got during the run
+    max_queue = 0
+
+    def track(lane):
+        nonlocal max_queue
+        if lane.size() > max_queue:
+            max_queue = lane.size()
+
+    for road in intersection.roads.values():
+        road.L2.listeners.append(track)
+
+    report = EventEngine(intersection, metrics, seed=seed).run(duration)
+
+    waits = LatencyHistogram()
+    for hist in metrics.wait_histograms.values():
+        waits.merge(hist)
+    return {
+        "vehicles_arrived": report["vehicles_arrived"],
+        "vehicles_served": report["vehicles_served"],
+        "throughput_per_hour": report["throughput_per_hour"],
+        "mean_wait": waits.mean(),
+        "p95_wait": waits.percentile(95),
+        "max_queue": max_queue,
+        "wall_seconds": report["wall_seconds"],
+    }
+
+
+def _run(names, values, seed, duration):
+    # Module level so the process pool can pickle it
+    return names, values, seed, run_scenario(dict(zip(names, values)), seed, duration)
+
+
+def parse_values(text):
+    """
+    "1,2.5,3" -> [1, 2.5, 3], and anything that isn't a number stays a string
+    ("priority,max-pressure")
+    """
+    values = []
+    for item in text.split(","):
+        for kind in (int, float, str):
+            try:
+                values.append(kind(item))
+                break
+            except ValueError:
+                pass
+    return values
+
+
+def parse_seeds(text):
+    """
+    "0-4" or "1,5,9" (or a mix) -> list of ints
+    """
+    seeds = []
+    for item in text.split(","):
+        first, _, last = item.partition("-")
+        if last:
+            seeds.extend(range(int(first), int(last) + 1))
+        else:
+            seeds.append(int(first))
+    return seeds
+
+
+def completed_runs(path, columns):
+    """
+    Keys (parameter values and seed, as written in the CSV) of the runs already in path
+    """
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return set()
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        if reader.fieldnames != columns:
+            raise ValueError(f"{path} was written by a sweep with different columns: {reader.fieldnames}")
+        return {tuple(row[name] for name in columns[:-len(RESULT_COLUMNS)]) for row in reader}
+
+
+def sweep(grid, seeds, duration, out_path, workers=None):
+    """
+    Runs every combination in grid ({name: [values]}) for every seed and appends
+    the results to out_path. Returns the number of runs done this time.
+    """
+    names = list(grid)
+    columns = names + ["seed"] + RESULT_COLUMNS
+    done = completed_runs(out_path, columns)
+
+    pending = []
+    for values in product(*(grid[name] for name in names)):
+        try:
+            check_params(dict(zip(names, values)))
+        except ValueError as e:
+            # Left out of the grid, so a resumed sweep doesn't try them again either
+            print(f"Skipping {dict(zip(names, values))}: {e}")
+            continue
+        for seed in seeds:
+            if tuple(str(v) for v in (*values, seed)) not in done:
+                pending.append((values, seed))
+    total = len(pending) + len(done)
+    print(f"{len(done)} of {total} runs already in {out_path}, {len(pending)} to go")
+    if not pending:
+        return 0
+
+    # A sweep cut short before its first row (or whose runs were all skipped) left
+    # just the header, so go by the file rather than by the rows in it
+    new_file = not os.path.exists(out_path) or os.path.getsize(out_path) == 0
+    start = time.perf_counter()
+    with open(out_path, "a", newline="") as f, ProcessPoolExecutor(max_workers=workers) as pool:
+        writer = csv.writer(f)
+        if new_file:
+            writer.writerow(columns)
+            f.flush()
+        futures = [pool.submit(_run, names, values, seed, duration) for values, seed in pending]
+        for finished, future in enumerate(as_completed(futures), 1):
+            try:
+                _, values, seed, result = future.result()
+            except ValueError as e:
+                # Invalid combinations are left out above; this is anything else a run rejects,
+                # and the rest of the grid still runs
+                print(f"[{finished}/{len(pending)}] skipped: {e}")
+                continue
+            writer.writerow([*values, seed, *(result[column] for column in RESULT_COLUMNS)])
+            f.flush()  # a crash or Ctrl+C only loses the runs still in flight
+            print(f"[{finished}/{len(pending)}] {dict(zip(names, values))} seed={seed}: "
+                  f"{result['throughput_per_hour']:.0f} veh/h, p95 wait {result['p95_wait']}")
+    print(f"{len(pending)} runs in {time.perf_counter() - start:.1f}s")
+    return len(pending)
+
+
+def summarize(path, names):
+    """
+    Averages each parameter combination over its seeds. Rows come back best throughput first.
+    """
+    groups = {}
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            groups.setdefault(tuple(row[name] for name in names), []).append(row)
+
+    summary = []
+    for key, rows in groups.items():
+        entry = dict(zip(names, key))
+        entry["seeds"] = len(rows)
+        for column in ("throughput_per_hour", "mean_wait", "p95_wait", "max_queue"):
+            values = [float(row[column]) for row in rows if row[column] != ""]
+            entry[column] = sum(values) / len(values) if values else None
+        summary.append(entry)
+    summary.sort(key=lambda entry: -(entry["throughput_per_hour"] or 0))
+    return summary
+
+
+def print_summary(summary, names):
+    header = names + ["seeds", "throughput/h", "mean wait", "p95 wait", "max queue"]
+    print("  ".join(f"{h:>14}" for h in header))
+
+    def fmt(value):
+        return "-" if value is None else f"{value:.1f}"
+
+    for entry in summary:
+        cells = [entry[name] for name in names] + [entry["seeds"]]
+        cells += [fmt(entry[column]) for column in ("throughput_per_hour", "mean_wait", "p95_wait", "max_queue")]
+        print("  ".join(f"{cell:>14}" for cell in cells))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a parameter sweep of headless scenarios")
+    parser.add_argument("--grid", action="append", default=[], metavar="NAME=V1,V2,...",
+                        help=f"values to try for a parameter ({', '.join(PARAMETERS)})")
+    parser.add_argument("--seeds", default="0-4", help="seeds to run every combination with, e.g. 0-9 or 1,5,9")
+    parser.add_argument("--duration", type=float, default=86400, help="simulated seconds per run")
+    parser.add_argument("--out", default="sweep.csv", help="results CSV (appended to, and used to resume)")
+    parser.add_argument("--workers", type=int, default=None, help="processes to use (default: one per core)")
+    args = parser.parse_args()
+
+    grid = {}
+    for spec in args.grid:
+        name, _, values = spec.partition("=")
+        if name not in PARAMETERS:
+            parser.error(f"unknown parameter {name!r}, expected one of {', '.join(PARAMETERS)}")
+        grid[name] = parse_values(values)
+    if not grid:
+        parser.error("give at least one --grid parameter")
+
+    sweep(grid, parse_seeds(args.seeds), args.duration, args.out, args.workers)
+    print()
+    print_summary(summarize(args.out, list(grid)), list(grid))
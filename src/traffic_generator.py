@@ -1,11 +1,13 @@
+import argparse
 import random
 import time
 import os
 
-LANES = ["AL2", "BL2", "CL2", "DL2"]
+from transport import DATA_DIR, LANES, TRANSPORTS, FileLaneWriter, open_writer
 
-# Folder where lane text files live
-DATA_DIR = 'lane_data'
+# Per-tick arrival odds for a lane: one vehicle is likely, a second one less so
+FIRST_VEHICLE_CHANCE = 0.8
+SECOND_VEHICLE_CHANCE = 0.4
 
 def ensure_lane_files():
     """
@@ -20,52 +22,101 @@ def ensure_lane_files():
             f = open(lane_file, "w")
             f.close()
 
-def generate_vehicles():
+def vehicles_arriving(rng=random):
     """
-    Randomly decide how many vehicles show up per lane and append them to the corresponding file.
+    Decide how many vehicles show up on one lane for a single generator tick.
+    rng can be any object with a random() method, e.g. a seeded random.Random.
     """
-    ensure_lane_files()
+    vehicle_to_add = 0
+
+    # High-ish chance of at least one vehicle
+    if rng.random()<FIRST_VEHICLE_CHANCE:
+        vehicle_to_add = vehicle_to_add + 1
+
+    # Lower chance of a second one
+    if rng.random()<SECOND_VEHICLE_CHANCE:
+        vehicle_to_add+=1
+
+    return vehicle_to_add
+
+def generate_vehicles(writer=None, rng=random):
+    """
+    Randomly decide how many vehicles show up per lane and hand them to the writer
+    (the lane text files by default). Pass a seeded random.Random as rng to make runs repeatable.
+    """
+    if writer is None:
+        ensure_lane_files()
+        writer = FileLaneWriter()
 
     for lane in LANES:
-        path = os.path.join(DATA_DIR, f"{lane}.txt")
-
-        vehicle_to_add = 0
-
-        # High-ish chance of at least one vehicle
-        if random.random()<0.8:
-            vehicle_to_add = vehicle_to_add + 1
-        
-        # Lower chance of a second one
-        if random.random()<0.4:
-            vehicle_to_add+=1
-        
+        vehicle_to_add = vehicles_arriving(rng)
+
         # Nothing to do for this lane
         if vehicle_to_add<=0:
             continue
-        
-        # Append new vehicle IDs
-        with open(path, "a") as lane_file:
-            for i in range(vehicle_to_add):
-                # Using time based IDs; not perfect but good enough
-                timestamp = int(time.time() * 1000)
-                vehicle_id = f"{lane}_{timestamp}"
-                lane_file.write(vehicle_id)
-                lane_file.write("\n")
-        
+
+        # Using time based IDs; not perfect but good enough
+        timestamps = [int(time.time() * 1000) for _ in range(vehicle_to_add)]
+        writer.write(lane, timestamps)
+
         print(f"[GENERATOR] Added {vehicle_to_add} vehicle(s) to {lane}")
 
-def run_generator_loop():
+def run_generator_loop(transport="file", seed=None, model=None):
+    """
+    model: an arrival_models generator (BulkGenerator) to use instead of the
+    built-in odds. seed only applies to the built-in odds; the generator has its own.
+    """
+    if transport == "file":
+        ensure_lane_files()
+    writer = open_writer(transport)
     print("Traffic generator started. Press Ctrl + C to stop it.")
 
     try:
-        while True:
-            generate_vehicles()
-            # Sleeping for 5 second feels realistic to me
-            time.sleep(5)
+        if model is not None:
+            # Runs until Ctrl + C, like the loop below
+            model.run_realtime(writer)
+        else:
+            rng = random.Random(seed)
+            while True:
+                generate_vehicles(writer, rng)
+                # Sleeping for 5 second feels realistic to me
+                time.sleep(5)
     
     except KeyboardInterrupt:
         print("\nTraffic generator stopped by user.")
+    finally:
+        writer.close()
 
 # Entry point
 if __name__ == "__main__":
-    run_generator_loop()
+    parser = argparse.ArgumentParser(description="Random vehicle generator")
+    parser.add_argument("--transport", choices=TRANSPORTS, default="file", help="where arrivals are written")
+    parser.add_argument("--seed", type=int, default=None, help="random seed, for repeatable arrivals")
+    parser.add_argument("--model", choices=("bernoulli", "poisson", "time-of-day", "platoon"),
+                        help="use a vectorised arrival model (needs numpy) instead of the built-in odds")
+    parser.add_argument("--rate", type=float, default=0.2, help="vehicles (or platoons) per second per lane for --model")
+    parser.add_argument("--platoon-size", type=float, default=5, help="mean platoon size for --model platoon")
+    parser.add_argument("--step", type=float, default=5, help="seconds per generator tick for --model")
+    parser.add_argument("--load-test", type=float, metavar="SECONDS",
+                        help="write this many seconds of --model traffic as fast as possible and report the rate")
+    args = parser.parse_args()
+
+    if args.model is None and args.load_test is None:
+        run_generator_loop(args.transport, seed=args.seed)
+    else:
+        from arrival_models import BulkGenerator, make_model
+
+        generator = BulkGenerator(make_model(args.model or "bernoulli", args.rate, args.platoon_size),
+                                  seed=args.seed, step=args.step)
+        if args.load_test is None:
+            run_generator_loop(args.transport, model=generator)
+        else:
+            if args.transport == "file":
+                ensure_lane_files()
+            writer = open_writer(args.transport)
+            try:
+                report = generator.load_test(writer, args.load_test)
+            finally:
+                writer.close()
+            print(f"Wrote {report['arrivals']} arrivals ({report['simulated_seconds']:.0f} simulated s) "
+                  f"in {report['wall_seconds']:.2f}s: {report['arrivals_per_second']:.0f} arrivals/s")
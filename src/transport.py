@@ -0,0 +1,477 @@
+"""
+Ways of getting vehicle arrivals from the generator to the simulator/visualizer.
+
+Every backend has the same tiny API:
+
+- writers: write(lane_id, timestamps) appends one vehicle per timestamp (ms)
+- readers: read_new(lane_id) returns the vehicle IDs that arrived since last call
+
+Backends:
+
+- "file": the original lane_data/<lane>.txt buffers (read + truncate). Easy to
+  debug, but only one consumer can use it and arrivals written between the read
+  and the truncate are lost.
+- "tail": the same lane files, but never truncated. Each reader tails them from
+  a persisted byte offset and the writer rotates them by size, so several
+  readers can follow the files independently.
+- "shm": a multiprocessing.shared_memory ring buffer. One producer, and every
+  reader keeps its own cursor, so the simulator and the visualizer both see
+  every arrival.
+- "binlog": the fixed-width binary arrival log from arrival_log.py, read through
+  mmap. Vehicle IDs are unique integers instead of "{lane}_{timestamp}".
+"""
+import json
+import os
+import struct
+import time
+from multiprocessing import shared_memory
+
+LANES = ["AL2", "BL2", "CL2", "DL2"]
+
+# Folder where lane text files live
+DATA_DIR = "lane_data"
+
+# Lane files are rotated to <lane>.txt.1 once they grow past this (tail transport)
+ROTATE_BYTES = 1024 * 1024
+
+SHM_NAME = "traffic_lanes"
+SHM_CAPACITY = 65536  # records; older ones get overwritten once a reader falls this far behind
+
+# Header: capacity, number of records ever written, epoch (when the segment was created,
+# in ns), end of the batch being written (equal to the count between batches)
+_HEADER = struct.Struct("<QQQQ")
+# Record: lane code, arrival timestamp in ms
+_RECORD = struct.Struct("<B7xq")
+
+LANE_CODES = {lane_id: code for code, lane_id in enumerate(LANES)}
+
+
+def make_vehicle_id(lane_id, timestamp):
+    """
+    Vehicle IDs are "{lane}_{timestamp}", same format the generator always used
+    """
+    return f"{lane_id}_{timestamp}"
+
+
+# ---------------- file backend ----------------
+
+class FileLaneWriter:
+    def __init__(self, data_dir=DATA_DIR, max_bytes=None):
+        self.data_dir = data_dir
+        # None means never rotate (the read-and-truncate reader keeps files small anyway)
+        self.max_bytes = max_bytes
+        os.makedirs(data_dir, exist_ok=True)
+
+    def write(self, lane_id, timestamps):
+        path = os.path.join(self.data_dir, f"{lane_id}.txt")
+        if self.max_bytes is not None and os.path.exists(path) and os.path.getsize(path) >= self.max_bytes:
+            # Readers tailing the old file still hold it open and finish it first
+            os.replace(path, path + ".1")
+
+        with open(path, "a") as lane_file:
+            for timestamp in timestamps:
+                lane_file.write(make_vehicle_id(lane_id, timestamp))
+                lane_file.write("\n")
+
+    def close(self):
+        pass
+
+
+class FileLaneReader:
+    """
+    Reads a lane file and wipes it so the same cars aren't processed again.
+    """
+
+    def __init__(self, data_dir=DATA_DIR):
+        self.data_dir = data_dir
+
+    def read_new(self, lane_id):
+        file_path = os.path.join(self.data_dir, f"{lane_id}.txt")
+        if not os.path.exists(file_path):
+            return []
+
+        with open(file_path, "r") as f:
+            lines = f.readlines()
+
+        if not lines:
+            return []
+
+        # Clear file after reading data
+        open(file_path, "w").close()
+        return [line.strip() for line in lines if line.strip()]
+
+    def state(self):
+        # Files are emptied as they're read, so there's no position to remember, and
+        # arrivals read since the last checkpoint are gone after a crash
+        return {}
+
+    def restore_state(self, state):
+        pass
+
+    def close(self):
+        pass
+
+
+class TailingFileReader:
+    """
+    Tails the lane files instead of truncating them.
+
+    For every lane it keeps the file open and remembers how many bytes it has
+    consumed. A tick only costs one os.stat per lane unless the file actually
+    changed, and then only the new bytes are read. The offsets are saved to
+    <data_dir>/.offsets-<consumer>.json so a restarted reader picks up where it
+    left off. Each consumer name gets its own offsets, so readers don't interfere.
+    """
+
+    SAVE_INTERVAL = 1.0  # seconds between offset saves
+
+    def __init__(self, data_dir=DATA_DIR, consumer="default"):
+        self.data_dir = data_dir
+        self.offsets_path = os.path.join(data_dir, f".offsets-{consumer}.json")
+
+        self.files = {}       # lane_id -> open binary file
+        self.offsets = {}     # lane_id -> {"inode": ..., "offset": ...}
+        self.last_stat = {}   # lane_id -> (size, mtime_ns) seen on the last read
+        self._dirty = False
+        self._last_save = 0.0
+
+        if os.path.exists(self.offsets_path):
+            with open(self.offsets_path) as f:
+                self.offsets = json.load(f)
+
+    def _read_lines(self, lane_id, f):
+        """
+        Reads complete lines from the current offset; a half-written last line is
+        left for the next call.
+        """
+        state = self.offsets[lane_id]
+        f.seek(state["offset"])
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            return []
+        state["offset"] += end
+        self._dirty = True
+        return [line for line in data[:end].decode().split("\n") if line.strip()]
+
+    def _open(self, lane_id, path, st):
+        """
+        Opens the lane file, resuming from the saved offset when it's still the same file.
+        Returns (file, vehicle_ids) where vehicle_ids are leftovers from a file that
+        got rotated while this reader wasn't running.
+        """
+        vehicle_ids = []
+        state = self.offsets.get(lane_id)
+        if state is not None and state["inode"] != st.st_ino:
+            try:
+                rotated = open(path + ".1", "rb")
+            except FileNotFoundError:
+                rotated = None
+            if rotated is not None:
+                with rotated:
+                    if os.fstat(rotated.fileno()).st_ino == state["inode"]:
+                        vehicle_ids = self._read_lines(lane_id, rotated)
+
+        f = open(path, "rb")
+        if state is None or state["inode"] != st.st_ino or state["offset"] > st.st_size:
+            # New or rotated file (or someone truncated it), start from the top
+            self.offsets[lane_id] = {"inode": st.st_ino, "offset": 0}
+            self._dirty = True
+        self.files[lane_id] = f
+        return f, vehicle_ids
+
+    def read_new(self, lane_id):
+        path = os.path.join(self.data_dir, f"{lane_id}.txt")
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return []
+
+        vehicle_ids = []
+        f = self.files.get(lane_id)
+        if f is not None and self.offsets[lane_id]["inode"] != st.st_ino:
+            # The writer rotated the file: drain what's left of the old one
+            vehicle_ids.extend(self._read_lines(lane_id, f))
+            f.close()
+            f = None
+            del self.files[lane_id]
+            self.offsets[lane_id] = {"inode": st.st_ino, "offset": 0}
+            self.last_stat.pop(lane_id, None)
+
+        if f is None:
+            f, leftovers = self._open(lane_id, path, st)
+            vehicle_ids.extend(leftovers)
+        elif self.last_stat.get(lane_id) == (st.st_size, st.st_mtime_ns):
+            return vehicle_ids
+        elif st.st_size < self.offsets[lane_id]["offset"]:
+            # Truncated in place, the old bytes are gone
+            self.offsets[lane_id]["offset"] = 0
+
+        self.last_stat[lane_id] = (st.st_size, st.st_mtime_ns)
+        vehicle_ids.extend(self._read_lines(lane_id, f))
+
+        if self._dirty and time.monotonic() - self._last_save >= self.SAVE_INTERVAL:
+            self.save_offsets()
+        return vehicle_ids
+
+    def state(self):
+        """
+        Read position, for checkpoints (see checkpoint.py)
+        """
+        return {"offsets": {lane_id: dict(state) for lane_id, state in self.offsets.items()}}
+
+    def restore_state(self, state):
+        """
+        Goes back to a position from state(); lanes are reopened on the next read
+        """
+        for f in self.files.values():
+            f.close()
+        self.files = {}
+        self.last_stat = {}
+        self.offsets = {lane_id: dict(lane_state) for lane_id, lane_state in state["offsets"].items()}
+        self.save_offsets()
+
+    def save_offsets(self):
+        tmp_path = self.offsets_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.offsets, f)
+        os.replace(tmp_path, self.offsets_path)
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+    def close(self):
+        if self._dirty:
+            self.save_offsets()
+        for f in self.files.values():
+            f.close()
+        self.files = {}
+
+
+# ---------------- shared memory backend ----------------
+
+class SharedMemoryRing:
+    """
+    Single-producer ring buffer of fixed-size arrival records in shared memory.
+
+    The producer writes the record first and only then bumps the write counter in
+    the header, so a reader never sees a half-written slot. Before a batch it
+    publishes where the batch will end, so a reader that was lapped can tell which
+    slots the batch may already have overwritten. Readers never write to the
+    segment; each one just remembers how far it has read.
+
+    The epoch tells segments under the same name apart: a producer that restarts
+    unlinks the old segment and creates a new one, which readers still mapping the
+    old one have to notice (SharedMemoryReader checks while it gets no data).
+    """
+
+    def __init__(self, name=SHM_NAME, capacity=SHM_CAPACITY, create=False):
+        size = _HEADER.size + capacity * _RECORD.size
+        if create:
+            try:
+                self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+                _HEADER.pack_into(self.shm.buf, 0, capacity, 0, time.time_ns(), 0)
+            except FileExistsError:
+                # Left over from a producer that didn't shut down cleanly; carry on from it
+                self.shm = shared_memory.SharedMemory(name=name)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            _untrack(self.shm)
+
+        self.owner = create
+        self.capacity, _, self.epoch, _ = _HEADER.unpack_from(self.shm.buf, 0)
+
+    def write_count(self):
+        return _HEADER.unpack_from(self.shm.buf, 0)[1]
+
+    def reserved(self):
+        # Highest count any slot may have been written for, published or not
+        return _HEADER.unpack_from(self.shm.buf, 0)[3]
+
+    def append(self, records):
+        """
+        records: iterable of (lane_code, timestamp) tuples
+        """
+        buf = self.shm.buf
+        records = list(records)
+        start = self.write_count()
+        # Announce the slots about to be overwritten, then fill them, then publish
+        _HEADER.pack_into(buf, 0, self.capacity, start, self.epoch, start + len(records))
+        count = start
+        for lane_code, timestamp in records:
+            offset = _HEADER.size + (count % self.capacity) * _RECORD.size
+            _RECORD.pack_into(buf, offset, lane_code, timestamp)
+            count += 1
+        # Publish after the records are in place
+        _HEADER.pack_into(buf, 0, self.capacity, count, self.epoch, count)
+
+    def read_from(self, cursor):
+        """
+        Returns (records, new_cursor, dropped) for everything written after cursor.
+        dropped counts records the reader was too slow to see before they got overwritten.
+        """
+        buf = self.shm.buf
+        end = self.write_count()
+        dropped = 0
+        if end - cursor > self.capacity:
+            dropped = end - self.capacity - cursor
+            cursor = end - self.capacity
+
+        records = []
+        for seq in range(cursor, end):
+            offset = _HEADER.size + (seq % self.capacity) * _RECORD.size
+            records.append(_RECORD.unpack_from(buf, offset))
+
+        # If the producer lapped us while we were copying, the oldest records may be torn,
+        # including slots of a batch it hasn't published yet
+        lapped = self.reserved() - self.capacity - cursor
+        if lapped > 0:
+            records = records[lapped:]
+            dropped += lapped
+        return records, end, dropped
+
+    def close(self):
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _untrack(shm):
+    # Attaching registers the segment with this process's resource tracker, which
+    # would unlink it when a consumer exits. Only the producer should do that.
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+
+
+class SharedMemoryWriter:
+    def __init__(self, name=SHM_NAME, capacity=SHM_CAPACITY):
+        self.ring = SharedMemoryRing(name, capacity, create=True)
+
+    def write(self, lane_id, timestamps):
+        code = LANE_CODES[lane_id]
+        self.ring.append((code, timestamp) for timestamp in timestamps)
+
+    def close(self):
+        self.ring.close()
+
+
+class SharedMemoryReader:
+    """
+    One independent consumer cursor on the ring. Starts at the current end of the
+    ring (only new arrivals) unless from_start is set. If the producer isn't
+    running yet it just keeps retrying on the next read. If it restarts (a new
+    segment under the same name), the reader moves over to the new segment and
+    reads it from the start.
+    """
+
+    RECHECK_INTERVAL = 1.0  # seconds between segment checks while no data comes in
+
+    def __init__(self, name=SHM_NAME, from_start=False):
+        self.name = name
+        self.from_start = from_start
+        self.ring = None
+        self.cursor = 0
+        self.epoch = None  # segment the cursor belongs to
+        self.dropped = 0
+        self.pending = {lane_id: [] for lane_id in LANES}
+        self._last_check = 0.0
+
+    def _attach(self):
+        try:
+            self.ring = SharedMemoryRing(self.name)
+        except FileNotFoundError:
+            return False
+        if self.epoch is not None and self.epoch != self.ring.epoch:
+            # The cursor was for a segment that's gone; everything in this one is new
+            self.cursor = 0
+        elif not self.from_start:
+            self.cursor = self.ring.write_count()
+        self.epoch = self.ring.epoch
+        self._last_check = time.monotonic()
+        return True
+
+    def _check_segment(self):
+        """
+        Moves over to a new segment if the producer has replaced the one we map
+        """
+        self._last_check = time.monotonic()
+        try:
+            current = SharedMemoryRing(self.name)
+        except FileNotFoundError:
+            # Producer gone and not back yet; the old mapping is still readable
+            return
+        if current.epoch == self.ring.epoch:
+            current.close()
+            return
+        self.ring.close()
+        self.ring = current
+        self.epoch = current.epoch
+        self.cursor = 0
+
+    def read_new(self, lane_id):
+        if self.ring is None and not self._attach():
+            return []
+
+        records, self.cursor, dropped = self.ring.read_from(self.cursor)
+        self.dropped += dropped
+        if not records and time.monotonic() - self._last_check >= self.RECHECK_INTERVAL:
+            self._check_segment()
+        for code, timestamp in records:
+            lane = LANES[code]
+            self.pending[lane].append(make_vehicle_id(lane, timestamp))
+
+        vehicle_ids = self.pending.get(lane_id, [])
+        self.pending[lane_id] = []
+        return vehicle_ids
+
+    def state(self):
+        return {"cursor": self.cursor, "epoch": self.epoch,
+                "pending": {lane_id: list(ids) for lane_id, ids in self.pending.items()}}
+
+    def restore_state(self, state):
+        self.cursor = state["cursor"]
+        self.epoch = state.get("epoch")
+        self.pending = {lane_id: list(ids) for lane_id, ids in state["pending"].items()}
+        # Keep the restored cursor when the ring gets attached (unless it's another segment by then)
+        self.from_start = True
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+    def close(self):
+        if self.ring is not None:
+            self.ring.close()
+
+
+def open_writer(transport="file"):
+    if transport == "file":
+        return FileLaneWriter()
+    if transport == "tail":
+        return FileLaneWriter(max_bytes=ROTATE_BYTES)
+    if transport == "shm":
+        return SharedMemoryWriter()
+    if transport == "binlog":
+        from arrival_log import ArrivalLogWriter  # arrival_log imports this module
+        return ArrivalLogWriter()
+    raise ValueError(f"unknown transport: {transport}")
+
+
+def open_reader(transport="file", consumer="default"):
+    """
+    consumer names the reader for transports that track per-reader progress
+    """
+    if transport == "file":
+        return FileLaneReader()
+    if transport == "tail":
+        return TailingFileReader(consumer=consumer)
+    if transport == "shm":
+        return SharedMemoryReader()
+    if transport == "binlog":
+        from arrival_log import ArrivalLogReader
+        return ArrivalLogReader(consumer=consumer)
+    raise ValueError(f"unknown transport: {transport}")
+
+
+TRANSPORTS = ("file", "tail", "shm", "binlog")
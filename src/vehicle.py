@@ -1,10 +1,63 @@
+import itertools
+
+# String labels of vehicles in compact lanes, swapped for negative integer codes
+# (caller IDs are non-negative, so the two never collide). A label is dropped once
+# no compact lane holds it any more.
+_next_code = itertools.count(-1, -1)
+_label_codes = {}  # label -> code
+_labels = {}       # code -> [label, number of queued vehicles using it]
+
+
 class Vehicle:
     """
     Simple vehicle representation for the simulation with each vehicle having it's own ID
     """
 
-    def __init__(self, vehicle_id):
+    # No per-object __dict__, this matters once lanes hold millions of cars
+    __slots__ = ("vehicle_id", "arrival_time")
+
+    def __init__(self, vehicle_id, arrival_time=None):
         self.vehicle_id = vehicle_id
+        self.arrival_time = arrival_time
 
     def __str__(self):
         return f"Vehicle({self.vehicle_id})"
+
+
+def compact_vehicle_id(vehicle_id):
+    """
+    Returns an integer ID usable by the compact lane store.
+    Integers are kept as they are. String labels like "AL2_1735600000000" are interned:
+    each distinct label is stored once and queued vehicles carry its code, which
+    vehicle_label turns back into the label. Every call takes a reference that
+    release_vehicle_id gives back.
+    """
+    if isinstance(vehicle_id, int):
+        if vehicle_id < 0:
+            raise ValueError("negative vehicle IDs are reserved for labels in compact lanes")
+        return vehicle_id
+    code = _label_codes.get(vehicle_id)
+    if code is None:
+        code = _label_codes[vehicle_id] = next(_next_code)
+        _labels[code] = [vehicle_id, 0]
+    _labels[code][1] += 1
+    return code
+
+
+def vehicle_label(code):
+    """
+    The vehicle ID behind a code from compact_vehicle_id
+    """
+    return _labels[code][0] if code < 0 else code
+
+
+def release_vehicle_id(code):
+    """
+    Called once the vehicle with this code has left its compact lane
+    """
+    if code < 0:
+        entry = _labels[code]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _labels[code]
+            del _label_codes[entry[0]]
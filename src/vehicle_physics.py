@@ -0,0 +1,345 @@
+"""
+Struct-of-arrays vehicle store for the visualizer's physics.
+
+Every car used to be a PhysicalVehicle with its own pygame.Vector2 and an
+update() method full of branches, run once per car per frame. Here all cars
+live in parallel NumPy arrays (position, speed, angle, road, turn, crossed
+flag, ...) and one update() moves all of them with whole-array operations:
+
+- car following: slow down near the car ahead on the same road, stop when close
+- stop line: wait at a red light unless it's a free (left) turn
+- movement: straight ahead until the stop line, then along the turn
+
+The rules, and the results, are the same as the old per-car code.
+"""
+import random
+
+import numpy as np
+
+ROADS = ("A", "B", "C", "D")
+ROAD_INDEX = {road_id: i for i, road_id in enumerate(ROADS)}
+
+STRAIGHT, LEFT, RIGHT = 0, 1, 2
+# Left-hand traffic logic for Nepal
+LANE_TURNS = {"L3": LEFT, "L1": RIGHT, "L2": STRAIGHT}
+
+# Random car color just for visual variety
+CAR_COLORS = [
+    (60, 120, 255),
+    (255, 80, 80),
+    (220, 220, 220),
+    (180, 100, 255)
+]
+
+# Direction of travel before the stop line, per road
+APPROACH = np.array([
+    (0, 1),    # A: north, drives down
+    (-1, 0),   # B: east, drives left
+    (0, -1),   # C: south, drives up
+    (1, 0),    # D: west, drives right
+], dtype=float)
+
+# dist_to_line = LINE_SIGN . (x, y, stop_line), positive before the line
+LINE_SIGN = np.array([
+    (0, -1, 1),   # A: stop_line - y
+    (1, 0, -1),   # B: x - stop_line
+    (0, 1, -1),   # C: y - stop_line
+    (-1, 0, 1),   # D: stop_line - x
+], dtype=float)
+
+
+class VehicleStore:
+    # Per-car arrays; prev_x/prev_y are the positions before the last update, for
+    # drawing in between two physics ticks
+    FIELDS = ("x", "y", "prev_x", "prev_y", "speed", "angle", "stop_line", "road", "turn", "color", "crossed")
+
+    def __init__(self, width, height, lane_width, max_speed, accel, brake, capacity=256):
+        self.width = width
+        self.height = height
+        self.lane_width = lane_width
+        self.road_width = lane_width * 3
+        self.max_speed = max_speed
+        self.accel = accel
+        self.brake = brake
+
+        self.n = 0
+        self._allocate(capacity)
+        self.ids = []    # vehicle IDs, same order as the arrays
+        self.views = []  # PhysicalVehicle views handed out, same order
+        self._leads_dirty = False
+        self.lead = np.full(capacity, -1, dtype=np.int64)
+        self.follower = np.full(capacity, -1, dtype=np.int64)
+
+        # After the stop line: (dx, dy) per unit of speed, fixed x, fixed y and
+        # new angle, per (road, turn). NaN means "leave as is".
+        cx, cy = width // 2, height // 2
+        nan = np.nan
+        self.turns = np.array([
+            # STRAIGHT                  LEFT                            RIGHT
+            [(0, 1, nan, nan, nan),     (-1, 0, nan, cy + 25, 180),     (1, 0, nan, cy - 25, 0)],     # A
+            [(-1, 0, nan, nan, nan),    (0, -1, cx - 25, nan, 90),      (0, 1, cx + 25, nan, 270)],   # B
+            [(0, -1, nan, nan, nan),    (1, 0, nan, cy - 25, 0),        (-1, 0, nan, cy + 25, 180)],  # C
+            [(1, 0, nan, nan, nan),     (0, 1, cx + 25, nan, 270),      (0, -1, cx - 25, nan, 90)],   # D
+        ], dtype=float)
+
+    def _allocate(self, capacity):
+        self.capacity = capacity
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.prev_x = np.zeros(capacity)
+        self.prev_y = np.zeros(capacity)
+        self.speed = np.zeros(capacity)
+        self.angle = np.zeros(capacity)
+        self.stop_line = np.zeros(capacity)
+        self.road = np.zeros(capacity, dtype=np.int64)
+        self.turn = np.zeros(capacity, dtype=np.int64)
+        self.color = np.zeros(capacity, dtype=np.int64)
+        self.crossed = np.zeros(capacity, dtype=bool)
+
+    def _grow(self):
+        old = {name: getattr(self, name) for name in self.FIELDS}
+        self._allocate(self.capacity * 2)
+        for name, values in old.items():
+            getattr(self, name)[:self.n] = values[:self.n]
+        self.lead = np.full(self.capacity, -1, dtype=np.int64)
+        self.follower = np.full(self.capacity, -1, dtype=np.int64)
+        self._leads_dirty = True
+
+    def __len__(self):
+        return self.n
+
+    def spawn(self, vehicle_id, road_id, lane_type="L2"):
+        """
+        Adds a car at the start of its road and returns a PhysicalVehicle view of it
+        """
+        if self.n == self.capacity:
+            self._grow()
+        i = self.n
+        self.n += 1
+
+        cx, cy = self.width // 2, self.height // 2
+        lw, rw = self.lane_width, self.road_width
+        # lane offset mapping (hardcoded but works fine)
+        off = {"L3": lw, "L2": 0, "L1": -lw}[lane_type]
+
+        # Initial spawn + stop line per road
+        if road_id == 'A':   # North
+            x, y, angle, stop_line = cx + lw // 2 + off, -50, 270, cy - rw // 2
+        elif road_id == 'B':  # East
+            x, y, angle, stop_line = self.width + 50, cy + lw // 2 + off, 180, cx + rw // 2
+        elif road_id == 'C':  # South
+            x, y, angle, stop_line = cx - lw // 2 - off, self.height + 50, 90, cy + rw // 2
+        else:  # 'D', West
+            x, y, angle, stop_line = -50, cy - lw // 2 - off, 0, cx - rw // 2
+
+        self.x[i], self.y[i], self.angle[i], self.stop_line[i] = x, y, angle, stop_line
+        self.prev_x[i], self.prev_y[i] = x, y
+        self.speed[i] = 0
+        self.road[i] = ROAD_INDEX[road_id]
+        self.turn[i] = LANE_TURNS[lane_type]
+        self.color[i] = random.randrange(len(CAR_COLORS))
+        self.crossed[i] = False
+
+        view = PhysicalVehicle(self, i, vehicle_id)
+        self.ids.append(vehicle_id)
+        self.views.append(view)
+        self._leads_dirty = True
+        return view
+
+    def _update_leads(self):
+        # The car ahead is the previous car spawned on the same road
+        n = self.n
+        order = np.argsort(self.road[:n], kind="stable")
+        lead = self.lead[:n]
+        lead[:] = -1
+        same_road = self.road[order[1:]] == self.road[order[:-1]]
+        lead[order[1:][same_road]] = order[:-1][same_road]
+        # ...and the other way round, for redoing followers in update()
+        follower = self.follower[:n]
+        follower[:] = -1
+        follower[order[:-1][same_road]] = order[1:][same_road]
+        self._leads_dirty = False
+
+    def count_waiting(self, road_id):
+        """
+        Cars on a road that haven't crossed the stop line yet
+        """
+        n = self.n
+        return int(np.count_nonzero((self.road[:n] == ROAD_INDEX[road_id]) & ~self.crossed[:n]))
+
+    def waiting_counts(self):
+        """
+        count_waiting for every road at once: {road_id: cars}
+        """
+        n = self.n
+        counts = np.bincount(self.road[:n][~self.crossed[:n]], minlength=len(ROADS))
+        return dict(zip(ROADS, counts.tolist()))
+
+    def _advance(self, idx, lead_x, lead_y, lead_speed, has_lead, green):
+        """
+        Where the cars idx end up after this frame, given where their lead cars end
+        up. Reads the current (start of frame) state and writes nothing.
+        """
+        x, y, speed = self.x[idx], self.y[idx], self.speed[idx]
+        road, crossed = self.road[idx], self.crossed[idx]
+        n = len(x)
+
+        # ---- basic car-following logic ----
+        target = np.full(n, float(self.max_speed))
+        dist = np.hypot(x - lead_x, y - lead_y)
+        target = np.where(has_lead & (dist < 70), lead_speed * 0.5, target)
+        target[has_lead & (dist < 45)] = 0
+
+        # ---- traffic light logic ----
+        sign = LINE_SIGN[road]
+        dist_to_line = sign[:, 0] * x + sign[:, 1] * y + sign[:, 2] * self.stop_line[idx]
+        waiting = ~crossed & (self.turn[idx] != LEFT) & ~green[road]
+        target[waiting & (dist_to_line > 0) & (dist_to_line < 40)] = 0
+        crossed = crossed | (dist_to_line < -5)
+
+        # ---- acceleration / braking ----
+        speed = np.where(speed < target, speed + self.accel,
+                         np.where(speed > target, speed - self.brake, speed))
+        np.maximum(speed, 0, out=speed)
+
+        # ---- movement ----
+        # Before the line: straight along the approach. After it: along the turn,
+        # snapped onto the exit lane
+        turn = self.turns[road, self.turn[idx]]
+        direction = np.where(crossed[:, None], turn[:, :2], APPROACH[road])
+        x = x + direction[:, 0] * speed
+        y = y + direction[:, 1] * speed
+        x = np.where(crossed & ~np.isnan(turn[:, 2]), turn[:, 2], x)
+        y = np.where(crossed & ~np.isnan(turn[:, 3]), turn[:, 3], y)
+        angle = np.where(crossed & ~np.isnan(turn[:, 4]), turn[:, 4], self.angle[idx])
+        return x, y, speed, crossed, angle
+
+    def update(self, green_roads):
+        """
+        Moves every car one frame. green_roads: road IDs whose light is green.
+
+        Cars react to where the car ahead ends up this frame, like the old per-car
+        loop did. So all cars are advanced at once against the start-of-frame
+        positions first, and then only the followers of cars that came out
+        differently are redone, until nothing changes. Usually that takes a round
+        or two; it's the length of the chain of cars close enough to react to each other.
+        """
+        n = self.n
+        if n == 0:
+            return
+        if self._leads_dirty:
+            self._update_leads()
+
+        green = np.zeros(len(ROADS), dtype=bool)
+        for road_id in green_roads:
+            green[ROAD_INDEX[road_id]] = True
+
+        everyone = np.arange(n)
+        lead = self.lead[:n]
+        has_lead = lead >= 0
+        lead_i = np.where(has_lead, lead, 0)
+        x, y, speed = self.x[:n], self.y[:n], self.speed[:n]
+        new_x, new_y, new_speed, new_crossed, new_angle = self._advance(
+            everyone, x[lead_i], y[lead_i], speed[lead_i], has_lead, green)
+
+        # Followers assumed their lead stayed where it was; redo those where it didn't
+        changed = np.flatnonzero((new_x != x) | (new_y != y) | (new_speed != speed))
+        follower = self.follower[:n]
+        while changed.size:
+            idx = follower[changed]
+            idx = idx[idx >= 0]
+            if not idx.size:
+                break
+            leads = lead[idx]
+            rx, ry, rs, rc, ra = self._advance(idx, new_x[leads], new_y[leads], new_speed[leads],
+                                               np.ones(len(idx), dtype=bool), green)
+            changed = idx[(rx != new_x[idx]) | (ry != new_y[idx]) | (rs != new_speed[idx])]
+            new_x[idx], new_y[idx], new_speed[idx], new_crossed[idx], new_angle[idx] = rx, ry, rs, rc, ra
+
+        self.prev_x[:n], self.prev_y[:n] = x, y
+        x[:], y[:], speed[:] = new_x, new_y, new_speed
+        self.crossed[:n] = new_crossed
+        self.angle[:n] = new_angle
+
+    def remove_offscreen(self, margin=100):
+        """
+        Drops cars that left the screen. Returns how many were removed.
+        """
+        n = self.n
+        x, y = self.x[:n], self.y[:n]
+        keep = (-margin < x) & (x < self.width + margin) & (-margin < y) & (y < self.height + margin)
+        kept = int(np.count_nonzero(keep))
+        if kept == n:
+            return 0
+
+        for name in self.FIELDS:
+            values = getattr(self, name)
+            values[:kept] = values[:n][keep]
+        for i in np.flatnonzero(~keep).tolist():
+            self.views[i].index = None  # gone; the view no longer points at anything
+        indices = np.flatnonzero(keep).tolist()
+        self.ids = [self.ids[i] for i in indices]
+        self.views = [self.views[i] for i in indices]
+        for new_index, view in enumerate(self.views):
+            view.index = new_index
+        self.n = kept
+        self._leads_dirty = True
+        return n - kept
+
+    def draw(self, surf, cache, alpha=1.0):
+        """
+        alpha: how far between the last two physics ticks to draw the cars (1 = latest positions)
+        """
+        n = self.n
+        xs, ys = self.x[:n], self.y[:n]
+        if alpha < 1:
+            xs = self.prev_x[:n] + (xs - self.prev_x[:n]) * alpha
+            ys = self.prev_y[:n] + (ys - self.prev_y[:n]) * alpha
+        blit = surf.blit
+        for x, y, angle, color in zip(xs.tolist(), ys.tolist(),
+                                      self.angle[:n].tolist(), self.color[:n].tolist()):
+            sprite, half_w, half_h = cache.car(CAR_COLORS[color], angle)
+            blit(sprite, (x - half_w, y - half_h))
+
+
+class PhysicalVehicle:
+    """
+    Thin view of one car in a VehicleStore, e.g. for drawing or inspecting a
+    single car. The physics runs on the whole store at once.
+    """
+
+    __slots__ = ("store", "index", "id")
+
+    def __init__(self, store, index, vehicle_id):
+        self.store = store
+        self.index = index
+        self.id = vehicle_id
+
+    @property
+    def road_id(self):
+        return ROADS[self.store.road[self.index]]
+
+    @property
+    def pos(self):
+        return (float(self.store.x[self.index]), float(self.store.y[self.index]))
+
+    @property
+    def speed(self):
+        return float(self.store.speed[self.index])
+
+    @property
+    def angle(self):
+        return float(self.store.angle[self.index])
+
+    @property
+    def crossed_line(self):
+        return bool(self.store.crossed[self.index])
+
+    @property
+    def body_color(self):
+        return CAR_COLORS[self.store.color[self.index]]
+
+    def draw(self, surf, cache):
+        sprite, half_w, half_h = cache.car(self.body_color, self.angle)
+        x, y = self.pos
+        surf.blit(sprite, (x - half_w, y - half_h))
@@ -1,13 +1,33 @@
-import pygame
-import random
+import argparse
 import os
-import math 
+import random
+import time
+
+import pygame
+
+from controllers import HysteresisController
+from ingest import ArrivalIngestor
+from metrics import LatencyHistogram
+from profiling import CaptureToggle, Profiler
+from traffic_generator import vehicles_arriving
+from transport import DATA_DIR, TRANSPORTS, open_reader
+from vehicle_physics import VehicleStore
 
 # ---------------- CONFIG ----------------
 # Screen stuff
 WIDTH, HEIGHT = 1000, 800
 FPS = 60
 
+# Physics runs at a fixed rate whatever the frame rate is
+TICK_RATE = 60
+TICK = 1 / TICK_RATE
+# Under load, run at most this many ticks per drawn frame (dropping frames to
+# catch up); beyond that the simulation slows down instead of falling further behind
+MAX_TICKS_PER_FRAME = 5
+
+# Generator round for --headless runs, in seconds (same as traffic_generator)
+ARRIVAL_INTERVAL = 5
+
 # Road / lane sizing
 LANE_WIDTH = 50
 ROAD_WIDTH = LANE_WIDTH * 3
@@ -28,183 +48,53 @@ GLOW_GREEN = (50, 255, 150)
 WHITE = (240, 240, 240)
 TEXT_COLOR = (200, 200, 200)
 
-DATA_DIR = "lane_data"
+# ---- LAYOUT ----
+_CX, _CY = WIDTH // 2, HEIGHT // 2
 
+# Road labels (just to recognize the roads)
+LABEL_POSITIONS = {
+    "A": (_CX + 100, 20),
+    "B": (WIDTH - 100, _CY + 90),
+    "C": (_CX - 180, HEIGHT - 50),
+    "D": (20, _CY - 110)
+}
 
-class PhysicalVehicle:
-    """
-    This class is intentionally a bit chunky. It handles both the vehicle's
-    state and its rendering. This is just for simplicity since this is a small
-    demo project.
-    """
+# Traffic light centers
+LIGHT_POSITIONS = {
+    "A": (_CX + ROAD_WIDTH // 2 + 25, _CY - ROAD_WIDTH // 2 - 25),
+    "B": (_CX + ROAD_WIDTH // 2 + 25, _CY + ROAD_WIDTH // 2 + 25),
+    "C": (_CX - ROAD_WIDTH // 2 - 25, _CY + ROAD_WIDTH // 2 + 25),
+    "D": (_CX - ROAD_WIDTH // 2 - 25, _CY - ROAD_WIDTH // 2 - 25)
+}
 
-    def __init__(self, vehicle_id, road_id, lane_type="L2"):
-        self.id = vehicle_id
-        self.road_id = road_id
-        self.lane_type = lane_type
 
-        self.speed = 0
-        self.crossed_line = False
+class RenderCache:
+    """
+    Everything the renderer used to rebuild on every frame, built once:
 
-        # Left-hand traffic logic for Nepal
-        if lane_type == "L3":
-            self.turn_dir = "LEFT"
-        elif lane_type == "L1":
-            self.turn_dir = "RIGHT"
-        else:
-            self.turn_dir = "STRAIGHT"
+    - car sprites, pre-rotated, keyed by (color, angle)
+    - the static scene (grass, roads, center lines, road labels)
+    - glow sprites for each light color
 
-        self.is_free_turn = (self.turn_dir == "LEFT")
+    A frame is then one background blit plus one blit per light and per car.
+    Needs the display to be set up first, so surfaces can be converted to its format.
+    """
 
-        cx, cy = WIDTH // 2, HEIGHT // 2
+    def __init__(self, font):
+        self.font = font
+        self.cars = {}  # (color, angle) -> (sprite, half width, half height)
 
-        # lane offset mapping (hardcoded but works fine)
-        lane_offsets = {
-            "L3": LANE_WIDTH,
-            "L2": 0,
-            "L1": -LANE_WIDTH
+        self.background = self._build_background()
+        # Road A's label lights up in priority mode, so it's kept out of the background
+        self.road_a_labels = {
+            active: font.render("ROAD A", True, GLOW_GREEN if active else TEXT_COLOR).convert_alpha()
+            for active in (False, True)
         }
-        off = lane_offsets[self.lane_type]
-
-        # Initial spawn + stop line per road
-        if road_id == 'A':   # North
-            self.pos = pygame.Vector2(cx + LANE_WIDTH // 2 + off, -50)
-            self.angle = 270
-            self.stop_line = cy - ROAD_WIDTH // 2
-
-        elif road_id == 'B':  # East
-            self.pos = pygame.Vector2(WIDTH + 50, cy + LANE_WIDTH // 2 + off)
-            self.angle = 180
-            self.stop_line = cx + ROAD_WIDTH // 2
-
-        elif road_id == 'C':  # South
-            self.pos = pygame.Vector2(cx - LANE_WIDTH // 2 - off, HEIGHT + 50)
-            self.angle = 90
-            self.stop_line = cy + ROAD_WIDTH // 2
-
-        elif road_id == 'D':  # West
-            self.pos = pygame.Vector2(-50, cy - LANE_WIDTH // 2 - off)
-            self.angle = 0
-            self.stop_line = cx - ROAD_WIDTH // 2
-
-        # Random car color just for visual variety
-        self.body_color = random.choice([
-            (60, 120, 255),
-            (255, 80, 80),
-            (220, 220, 220),
-            (180, 100, 255)
-        ])
-
-    def update(self, lead_vehicle, is_green):
-        target_speed = MAX_SPEED
-
-        # ---- basic car-following logic ----
-        if lead_vehicle is not None:
-            dist = self.pos.distance_to(lead_vehicle.pos)
-
-            if dist < 70:
-                target_speed = lead_vehicle.speed * 0.5
-
-            if dist < 45:
-                target_speed = 0
-
-        # ---- traffic light logic ----
-        dist_to_line = self.get_dist_line()
-
-        if not self.crossed_line:
-            if not self.is_free_turn and not is_green:
-                if 0 < dist_to_line < 40:
-                    target_speed = 0
-
-            if dist_to_line < -5:
-                self.crossed_line = True
-
-        # ---- acceleration / braking ----
-        if self.speed < target_speed:
-            self.speed += ACCEL
-        elif self.speed > target_speed:
-            self.speed -= BRAKE
-
-        if self.speed < 0:
-            self.speed = 0
-
-        # ---- movement ----
-        if not self.crossed_line:
-            move_vec = pygame.Vector2(self.speed, 0).rotate(-self.angle)
-            self.pos += move_vec
-        else:
-            self.apply_turn()
+        self.glows = {color: self._build_glow(color) for color in (GLOW_GREEN, GLOW_RED)}
 
-    def apply_turn(self):
-        """
-        This is definitely the messiest part of the code.
-        """
-        cx, cy = WIDTH // 2, HEIGHT // 2
-        s = self.speed
-
-        if self.road_id == 'A':
-            if self.turn_dir == 'LEFT':
-                self.pos.x -= s
-                self.pos.y = cy + 25
-                self.angle = 180
-            elif self.turn_dir == 'RIGHT':
-                self.pos.x += s
-                self.pos.y = cy - 25
-                self.angle = 0
-            else:
-                self.pos.y += s
-
-        elif self.road_id == 'B':
-            if self.turn_dir == 'LEFT':
-                self.pos.y -= s
-                self.pos.x = cx - 25
-                self.angle = 90
-            elif self.turn_dir == 'RIGHT':
-                self.pos.y += s
-                self.pos.x = cx + 25
-                self.angle = 270
-            else:
-                self.pos.x -= s
-
-        elif self.road_id == 'C':
-            if self.turn_dir == 'LEFT':
-                self.pos.x += s
-                self.pos.y = cy - 25
-                self.angle = 0
-            elif self.turn_dir == 'RIGHT':
-                self.pos.x -= s
-                self.pos.y = cy + 25
-                self.angle = 180
-            else:
-                self.pos.y -= s
-
-        elif self.road_id == 'D':
-            if self.turn_dir == 'LEFT':
-                self.pos.y += s
-                self.pos.x = cx + 25
-                self.angle = 270
-            elif self.turn_dir == 'RIGHT':
-                self.pos.y -= s
-                self.pos.x = cx - 25
-                self.angle = 90
-            else:
-                self.pos.x += s
-
-    def get_dist_line(self):
-        # Distance from current stop line (sign depends on road)
-        if self.road_id == 'A':
-            return self.stop_line - self.pos.y
-        if self.road_id == 'B':
-            return self.pos.x - self.stop_line
-        if self.road_id == 'C':
-            return self.pos.y - self.stop_line
-        if self.road_id == 'D':
-            return self.stop_line - self.pos.x
-
-        return 9999   # should never happen
-
-    def draw(self, surf):
-        # Create a small surface so rotation looks clean
+    @staticmethod
+    def _build_car(color):
+        # Small surface so rotation looks clean
         car_surf = pygame.Surface((42, 26), pygame.SRCALPHA)
 
         # Shadow first to give depth
@@ -216,7 +106,7 @@ class PhysicalVehicle:
 
         # Main body
         pygame.draw.rect(
-            car_surf, self.body_color,
+            car_surf, color,
             (0, 0, 40, 24),
             border_radius=5
         )
@@ -227,56 +117,41 @@ class PhysicalVehicle:
             (28, 3, 8, 18),
             border_radius=2
         )
-
-        rotated = pygame.transform.rotate(car_surf, self.angle)
-        surf.blit(rotated, rotated.get_rect(center=(self.pos.x, self.pos.y)))
-
-
-class Simulation:
-    def __init__(self):
-        pygame.init()
-
-        self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
-        pygame.display.set_caption("Traffic Light Visualizer")
-
-        self.clock = pygame.time.Clock()
-        self.font = pygame.font.SysFont("Outfit", 36)
-
-        # Vehicles grouped by road
-        self.vehicles = {
-            "A": [],
-            "B": [],
-            "C": [],
-            "D": []
-        }
-
-        self.current_green = "A"
-        self.timer = 0
-        
-        # PRIORITY LOGIC: Track state of priority mode
-        self.priority_active = False
-
-    def draw_aesthetic_bg(self):
-        self.screen.fill(BG_GREEN)
+        return car_surf
+
+    def car(self, color, angle):
+        key = (color, int(angle) % 360)
+        entry = self.cars.get(key)
+        if entry is None:
+            upright = self.cars.get((color, None))
+            if upright is None:
+                upright = self.cars[(color, None)] = self._build_car(color)
+            sprite = pygame.transform.rotate(upright, key[1]).convert_alpha()
+            entry = self.cars[key] = (sprite, sprite.get_width() / 2, sprite.get_height() / 2)
+        return entry
+
+    def _build_background(self):
+        bg = pygame.Surface((WIDTH, HEIGHT))
+        bg.fill(BG_GREEN)
         cx, cy = WIDTH // 2, HEIGHT // 2
 
         # Road shadows (prob not needed but looks nice)
         pygame.draw.rect(
-            self.screen, (20, 20, 20),
+            bg, (20, 20, 20),
             (cx - ROAD_WIDTH // 2 - 5, 0, ROAD_WIDTH + 10, HEIGHT)
         )
         pygame.draw.rect(
-            self.screen, (20, 20, 20),
+            bg, (20, 20, 20),
             (0, cy - ROAD_WIDTH // 2 - 5, WIDTH, ROAD_WIDTH + 10)
         )
 
         # Main roads
         pygame.draw.rect(
-            self.screen, ROAD_COLOR,
+            bg, ROAD_COLOR,
             (cx - ROAD_WIDTH // 2, 0, ROAD_WIDTH, HEIGHT)
         )
         pygame.draw.rect(
-            self.screen, ROAD_COLOR,
+            bg, ROAD_COLOR,
             (0, cy - ROAD_WIDTH // 2, WIDTH, ROAD_WIDTH)
         )
 
@@ -285,126 +160,267 @@ class Simulation:
             length = end - start
             for i in range(0, length, 40):
                 if vertical:
-                    pygame.draw.rect(self.screen, CENTER_LINE, (cx - 1, start + i, 3, 20))
+                    pygame.draw.rect(bg, CENTER_LINE, (cx - 1, start + i, 3, 20))
                 else:
-                    pygame.draw.rect(self.screen, CENTER_LINE, (start + i, cy - 1, 20, 3))
+                    pygame.draw.rect(bg, CENTER_LINE, (start + i, cy - 1, 20, 3))
 
         draw_dotted_line(0, cy - ROAD_WIDTH // 2)
         draw_dotted_line(cy + ROAD_WIDTH // 2, HEIGHT)
         draw_dotted_line(0, cx - ROAD_WIDTH // 2, False)
         draw_dotted_line(cx + ROAD_WIDTH // 2, WIDTH, False)
 
-        # Road labels (just to recognize the roads)
-        labels = {
-            "A": (cx + 100, 20),
-            "B": (WIDTH - 100, cy + 90),
-            "C": (cx - 180, HEIGHT - 50),
-            "D": (20, cy - 110)
-        }
+        # Road labels (just to recognize the roads); A is drawn per frame
+        for road, pos in LABEL_POSITIONS.items():
+            if road != "A":
+                bg.blit(self.font.render(f"ROAD {road}", True, TEXT_COLOR), pos)
+
+        return bg.convert()
 
-        for road, pos in labels.items():
-            # Highlight Road A label if priority is active
-            color = GLOW_GREEN if (road == "A" and self.priority_active) else TEXT_COLOR
-            txt = self.font.render(f"ROAD {road}", True, color)
-            self.screen.blit(txt, pos)
+    @staticmethod
+    def _build_glow(color):
+        # All the glow layers plus the light itself, composed into one sprite
+        glow = pygame.Surface((60, 60), pygame.SRCALPHA)
+        for r in range(1, 15, 3):
+            layer = pygame.Surface((60, 60), pygame.SRCALPHA)
+            pygame.draw.circle(layer, (*color, 100 // r), (30, 30), 10 + r)
+            glow.blit(layer, (0, 0))
+        pygame.draw.circle(glow, color, (30, 30), 10)
+        return glow.convert_alpha()
+
+
+class Simulation:
+    def __init__(self, transport="file", seed=None, controller=None, profiler=None):
+        """
+        transport=None spawns cars from a seeded copy of the generator's odds
+        instead of reading them from a transport (for headless runs).
+        controller picks the green road every tick (see controllers.py); the default
+        is round robin with road A taking over above 10 waiting cars until it's down to 5.
+        profiler times the ingest, physics and render phases (see profiling.py).
+        """
+        pygame.init()
+
+        self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
+        pygame.display.set_caption("Traffic Light Visualizer")
+
+        self.clock = pygame.time.Clock()
+        self.font = pygame.font.SysFont("Outfit", 36)
+        self.render_cache = RenderCache(self.font)
+
+        # Every car on screen, in one struct-of-arrays store (see vehicle_physics.py)
+        self.vehicles = VehicleStore(WIDTH, HEIGHT, LANE_WIDTH, MAX_SPEED, ACCEL, BRAKE)
+
+        self.controller = controller if controller is not None else HysteresisController()
+        self.current_green = "A"
+        self.ticks = 0
+        self.vehicles_spawned = 0
+        self.vehicles_exited = 0
+
+        # Where new arrivals come from (lane files or shared memory). The transport is
+        # read on a background thread so slow file I/O never stalls a frame
+        if transport is None:
+            self.ingestor = None
+            self.rng = random.Random(seed)
+        else:
+            self.ingestor = ArrivalIngestor(open_reader(transport, consumer="visualizer")).start()
+
+        # Time spent per drawn frame (ticks + drawing, not waiting on the clock), in ms
+        self.frame_ms = LatencyHistogram()
+        self.profiler = profiler if profiler is not None else Profiler()
+
+    def draw_aesthetic_bg(self):
+        cache = self.render_cache
+        self.screen.blit(cache.background, (0, 0))
+
+        # Highlight Road A label if priority is active
+        self.screen.blit(cache.road_a_labels[self.priority_active], LABEL_POSITIONS["A"])
 
         # Traffic lights w/ glow
-        lights = {
-            "A": (cx + ROAD_WIDTH // 2 + 25, cy - ROAD_WIDTH // 2 - 25),
-            "B": (cx + ROAD_WIDTH // 2 + 25, cy + ROAD_WIDTH // 2 + 25),
-            "C": (cx - ROAD_WIDTH // 2 - 25, cy + ROAD_WIDTH // 2 + 25),
-            "D": (cx - ROAD_WIDTH // 2 - 25, cy - ROAD_WIDTH // 2 - 25)
+        for rid, pos in LIGHT_POSITIONS.items():
+            color = GLOW_GREEN if rid == self.current_green else GLOW_RED
+            self.screen.blit(cache.glows[color], (pos[0] - 30, pos[1] - 30))
+
+    @property
+    def priority_active(self):
+        # Only controllers with a priority mode have the flag
+        return getattr(self.controller, "priority_active", False)
+
+    def spawn_arrivals(self):
+        if self.ingestor is not None:
+            for lane_id, vehicle_ids in self.ingestor.drain():
+                rid = lane_id[0]
+                for vid in vehicle_ids:
+                    # Cars default to L2, which matches the lane
+                    self.vehicles.spawn(vid, rid)
+                self.vehicles_spawned += len(vehicle_ids)
+        elif self.ticks % (ARRIVAL_INTERVAL * TICK_RATE) == 0:
+            for rid in ["A", "B", "C", "D"]:
+                for _ in range(vehicles_arriving(self.rng)):
+                    self.vehicles_spawned += 1
+                    self.vehicles.spawn(self.vehicles_spawned, rid)
+
+    def tick(self):
+        """
+        One fixed physics step: arrivals, signals, vehicle movement
+        """
+        profiler = self.profiler
+        # --- vehicle injection ---
+        with profiler.phase("ingest"):
+            self.spawn_arrivals()
+
+        with profiler.phase("physics"):
+            # --- traffic signal (in simulated time, so it doesn't depend on the frame rate) ---
+            # Cars waiting = on the road, not across the stop line yet. An empty plan keeps the light
+            plan = self.controller.decide(self.vehicles.waiting_counts(), (self.ticks + 1) * TICK)
+            if plan:
+                self.current_green = plan[0][0]
+
+            # --- update vehicles ---
+            self.vehicles.update((self.current_green,))
+
+            # cleanup offscreen cars
+            self.vehicles_exited += self.vehicles.remove_offscreen()
+        self.ticks += 1
+
+    def render(self, alpha=1.0):
+        """
+        Draws the scene, with cars alpha of the way from the previous tick to the latest one
+        """
+        self.draw_aesthetic_bg()
+        self.vehicles.draw(self.screen, self.render_cache, alpha)
+
+    def close(self):
+        if self.ingestor is not None:
+            self.ingestor.stop()
+
+    def stats(self):
+        """
+        Frame time and ingestion timings (ms) as {name: (p50, p99, max)}, for whatever was recorded
+        """
+        hists = {"frame": self.frame_ms}
+        if self.ingestor is not None:
+            hists["ingest latency"] = self.ingestor.latency_ms
+            hists["ingest read"] = self.ingestor.read_ms.copy()
+        return {
+            name: (hist.percentile(50), hist.percentile(99), hist.max)
+            for name, hist in hists.items() if hist.count
         }
 
-        for rid, pos in lights.items():
-            is_active = (rid == self.current_green)
-            color = GLOW_GREEN if is_active else GLOW_RED
-
-            # Glow layers
-            for r in range(1, 15, 3):
-                glow = pygame.Surface((60, 60), pygame.SRCALPHA)
-                pygame.draw.circle(glow, (*color, 100 // r), (30, 30), 10 + r)
-                self.screen.blit(glow, (pos[0] - 30, pos[1] - 30))
-
-            pygame.draw.circle(self.screen, color, pos, 10)
-
-    # PRIORITY LOGIC: Calculate if AL2 needs priority
-    def update_priority_state(self):
-        # Count vehicles in Road A that haven't crossed the line yet
-        al2_count = 0
-        for v in self.vehicles["A"]:
-            if not v.crossed_line:
-                al2_count += 1
-        
-        # Hysteresis Logic:
-        # Activate if > 10
-        if not self.priority_active and al2_count > 10:
-            self.priority_active = True
-        
-        # Deactivate only if it drops to <= 5
-        elif self.priority_active and al2_count <= 5:
-            self.priority_active = False
-
-    def run(self):
+    def print_stats(self):
+        for name, (p50, p99, worst) in self.stats().items():
+            print(f"[VISUALIZER] {name}: p50={p50:.2f}ms p99={p99:.2f}ms max={worst:.2f}ms")
+        if self.profiler.enabled:
+            self.profiler.print_report("[PROFILE] ")
+
+    def run(self, stats_interval=None):
+        """
+        stats_interval: print frame/ingest timings every this many seconds (and always on exit)
+        """
+        next_stats = time.perf_counter() + stats_interval if stats_interval else None
+
+        # Fixed timestep: real time piles up in the accumulator and is spent in
+        # whole ticks; whatever is left over says how far to interpolate the drawing
+        accumulator = 0.0
+        previous = time.perf_counter()
         while True:
-            # --- file-based vehicle injection ---
-            # not super efficient, but easy to debug
-            for rid in ["A", "B", "C", "D"]:
-                path = os.path.join(DATA_DIR, f"{rid}L2.txt")
-                if os.path.exists(path) and os.path.getsize(path) > 0:
-                    with open(path, "r") as f:
-                        for line in f:
-                            vid = line.strip()
-                            # PhysicalVehicle defaults to L2, which matches the file
-                            self.vehicles[rid].append(
-                                PhysicalVehicle(vid, rid)
-                            )
-                    open(path, "w").close()
-
-            # --- Update Priority State ---
-            self.update_priority_state()
-
-            # --- traffic signal timer ---
-            if self.priority_active:
-                # Force Green for A, pause normal timer logic
-                self.current_green = "A"
-                self.timer = 0
-            else:
-                # Normal Round-robin logic
-                self.timer += 1
-                if self.timer > 300:
-                    order = ["A", "D", "C", "B"]
-                    idx = order.index(self.current_green)
-                    self.current_green = order[(idx + 1) % 4]
-                    self.timer = 0
-
-            self.draw_aesthetic_bg()
-
-            # --- update + draw vehicles ---
-            for rid, v_list in self.vehicles.items():
-                for i, car in enumerate(v_list):
-                    lead_car = v_list[i - 1] if i > 0 else None
-                    car.update(lead_car, rid == self.current_green)
-                    car.draw(self.screen)
-
-                # cleanup offscreen cars
-                self.vehicles[rid] = [
-                    v for v in v_list
-                    if -100 < v.pos.x < WIDTH + 100
-                    and -100 < v.pos.y < HEIGHT + 100
-                ]
+            now = time.perf_counter()
+            accumulator += now - previous
+            previous = now
+
+            ticks = 0
+            while accumulator >= TICK and ticks < MAX_TICKS_PER_FRAME:
+                self.tick()
+                accumulator -= TICK
+                ticks += 1
+            if ticks == MAX_TICKS_PER_FRAME and accumulator >= TICK:
+                # Too far behind to catch up; let the simulation slow down instead
+                accumulator = 0.0
 
             # --- events ---
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
+                    self.close()
+                    self.print_stats()
                     return
 
-            pygame.display.flip()
+            with self.profiler.phase("render"):
+                self.render(accumulator / TICK)
+                pygame.display.flip()
+            self.frame_ms.record((time.perf_counter() - now) * 1000)
+
+            if next_stats is not None and now >= next_stats:
+                self.print_stats()
+                next_stats = now + stats_interval
             self.clock.tick(FPS)
 
+    def run_headless(self, ticks, render_every=0):
+        """
+        Runs ticks physics steps as fast as possible, without waiting for the
+        clock. render_every=N also draws every N-th tick (to the SDL dummy display
+        when headless), to include rendering in the measurement.
+        """
+        start = time.perf_counter()
+        for i in range(ticks):
+            frame_start = time.perf_counter()
+            self.tick()
+            if render_every and i % render_every == 0:
+                with self.profiler.phase("render"):
+                    self.render()
+                self.frame_ms.record((time.perf_counter() - frame_start) * 1000)
+        wall = time.perf_counter() - start
+        return {
+            "ticks": ticks,
+            "simulated_seconds": ticks / TICK_RATE,
+            "wall_seconds": wall,
+            "ticks_per_second": ticks / wall if wall > 0 else float("inf"),
+            "vehicles_spawned": self.vehicles_spawned,
+            "vehicles_exited": self.vehicles_exited,
+            "vehicles_on_screen": len(self.vehicles),
+            **{f"{name} ms (p50, p99, max)": stats for name, stats in self.stats().items()},
+        }
+
 
 if __name__ == "__main__":
     if not os.path.exists(DATA_DIR):
         os.makedirs(DATA_DIR)
 
-    Simulation().run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Traffic Light Visualizer")
+    parser.add_argument("--transport", choices=TRANSPORTS, default=None,
+                        help="where arrivals are read from (default: file; --headless uses seeded arrivals instead)")
+    parser.add_argument("--headless", action="store_true",
+                        help="no window: run the physics as fast as possible and report ticks per second")
+    parser.add_argument("--ticks", type=int, default=TICK_RATE * 3600, help="ticks to run with --headless")
+    parser.add_argument("--seed", type=int, default=0, help="seed for --headless arrivals")
+    parser.add_argument("--render-every", type=int, default=0, metavar="N",
+                        help="with --headless, also draw every N-th tick")
+    parser.add_argument("--stats", type=float, metavar="SECONDS",
+                        help="print frame time and ingestion latency every SECONDS")
+    parser.add_argument("--profile", action="store_true",
+                        help="time the ingest, physics and render phases (printed with the stats)")
+    parser.add_argument("--cprofile", metavar="PATH",
+                        help="capture a cProfile of the whole run to PATH (SIGUSR1 also starts/stops a capture)")
+    args = parser.parse_args()
+
+    # kill -USR1 <pid> starts a cProfile capture and the next one writes it out
+    capture = CaptureToggle(args.cprofile or "visualizer.prof")
+    capture.install_signal()
+    if args.cprofile:
+        capture.start()
+    profiler = Profiler(enabled=args.profile)
+
+    if args.headless:
+        # No window needed; SDL picks its video driver in pygame.init()
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        sim = Simulation(args.transport, seed=args.seed, profiler=profiler)
+        try:
+            report = sim.run_headless(args.ticks, args.render_every)
+        finally:
+            sim.close()
+        for key, value in report.items():
+            print(f"{key}: {value}")
+        if profiler.enabled:
+            profiler.print_report("[PROFILE] ")
+    else:
+        Simulation(args.transport or "file", profiler=profiler).run(args.stats)
+
+    if capture.active:
+        print(f"cProfile capture written to {capture.stop()}")